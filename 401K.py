@@ -6,9 +6,51 @@ Copyright © 2019 Jas Lau. All rights reserved.
 """
 
 from enum import Enum
-import numpy
+import bisect
+import collections
+import contextlib
+import functools
+import importlib
+import io
+import itertools
+import json
+import math
+import os
 import random
 import string
+import sys
+import time
+
+
+class _LazyModule:
+    """Stand-in for a heavy module, imported on first attribute access.
+    The module then replaces the stand-in in the globals, so later lookups
+    cost nothing extra. A single-employee run never pays for these imports."""
+
+    def __init__(self, name, alias):
+        self.__name = name
+        self.__alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name)
+        globals()[self.__alias] = module
+        return getattr(module, attr)
+
+
+# heavy modules only the batch, roster, service, storage and benchmark
+# features need
+numpy = _LazyModule('numpy', 'numpy')
+csv = _LazyModule('csv', 'csv')
+subprocess = _LazyModule('subprocess', 'subprocess')
+tracemalloc = _LazyModule('tracemalloc', 'tracemalloc')
+asyncio = _LazyModule('asyncio', 'asyncio')
+futures = _LazyModule('concurrent.futures', 'futures')
+sqlite3 = _LazyModule('sqlite3', 'sqlite3')
+argparse = _LazyModule('argparse', 'argparse')
+platform = _LazyModule('platform', 'platform')
+datetime = _LazyModule('datetime', 'datetime')
+threading = _LazyModule('threading', 'threading')
+pickle = _LazyModule('pickle', 'pickle')
 
 
 class Error(Exception):
@@ -26,8 +68,102 @@ class IsFull(Error):
     pass
 
 
+# ====================== START OF PAY LOOKUP ======================
+# Rates, hours and salaries come from a small set of values, so the pay
+# figures are memoized and shared by every object and every report. Callers
+# validate their inputs first, so only valid values are ever cached.
+PAY_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=PAY_CACHE_SIZE)
+def worker_pay(rate, hour):
+    """Gross pay and monthly pay of a production worker.
+        Worker's monthly pay = gross pay * 4
+
+    Args:
+        rate (int): Valid hourly pay rate
+        hour (int): Valid hours worked
+
+    Returns:
+        tuple: (gross pay, monthly pay)
+    """
+    gross = rate * hour
+    return gross, gross * 4
+
+
+@functools.lru_cache(maxsize=PAY_CACHE_SIZE)
+def supervisor_pay(salary):
+    """Monthly pay of a supervisor, as reported and as matched.
+        Supervisor's monthly pay = salary / 12
+
+    Args:
+        salary (int): Valid annual salary
+
+    Returns:
+        tuple: (monthly pay shown in the report, monthly pay the max match
+        is computed from)
+    """
+    return int(salary / 12), salary // 12
+
+
+@functools.lru_cache(maxsize=PAY_CACHE_SIZE)
+def match_of(monthly_pay, match):
+    """Max match of a monthly pay.
+
+    Args:
+        monthly_pay (int): Monthly pay
+        match (float): Match rate
+
+    Returns:
+        int: monthly pay * match
+    """
+    return int(monthly_pay * match)
+
+
+PAY_CACHES = {
+    'worker_pay': worker_pay,
+    'supervisor_pay': supervisor_pay,
+    'match_of': match_of,
+}
+
+
+def pay_cache_stats():
+    """Hit/miss figures of the pay lookups.
+
+    Returns:
+        dict: name -> {'hits', 'misses', 'size', 'maxsize'}
+    """
+    stats = {}
+    for name, lookup in PAY_CACHES.items():
+        info = lookup.cache_info()
+        stats[name] = {'hits': info.hits, 'misses': info.misses,
+                       'size': info.currsize, 'maxsize': info.maxsize}
+    return stats
+
+
+def clear_pay_cache():
+    """Empty the pay lookups and reset their statistics."""
+    for lookup in PAY_CACHES.values():
+        lookup.cache_clear()
+
+
+# ====================== END OF PAY LOOKUP ======================
+
+
 # ====================== Base Class: Employee Class ======================
 class Employee:
+    # Instance layout of the whole hierarchy. ProductionWorker and
+    # ShiftSupervisor both extend Employee and are combined by Member401k,
+    # and Python can not combine two bases that each add their own slots, so
+    # the private fields of both branches are declared here.
+    __slots__ = ('__name', '__number', '__benefits',
+                 '_ProductionWorker__shift', '_ProductionWorker__rate',
+                 '_ProductionWorker__hour',
+                 '_ShiftSupervisor__salary', '_ShiftSupervisor__shift',
+                 '_ShiftSupervisor__num_worker', '_ShiftSupervisor__capacity',
+                 '_ShiftSupervisor__roster', '_ShiftSupervisor__bonus_period',
+                 '__watchers')
+
     # static member
     DEFAULT_NAME = "unidentified"
     DEFAULT_NUM = 1234
@@ -37,6 +173,9 @@ class Employee:
 
     # constructor
     def __init__(self, name, number):
+        # registries indexing this employee, see _watch(). Derived classes
+        # set it before their own setters run.
+        self.__watchers = ()
         self.employee_name = name
         self.employee_num = number
 
@@ -85,6 +224,8 @@ class Employee:
             self.__benefits = True
         else:
             self.__benefits = False
+        if self.__watchers:
+            self._notify()
 
     # helper function
     def __str__(self):
@@ -94,14 +235,42 @@ class Employee:
         Returns:
             str: Return a string. 
         """
+        out = io.StringIO()
+        self.write_to(out)
+        return out.getvalue()
+
+    def write_to(self, out):
+        """Write employees' information to a file-like object. Derived
+        classes extend it, so __str__ and the report writer share one
+        implementation.
+
+        Args:
+            out (file): Writable text stream
+        """
         if self.get_determine_benefits():
             ret_str_bnft = "Benefits"
         else:
             ret_str_bnft = "No Benefits"
 
-        ret_str = '\n{} | ID #: {} | (*{})'.format(self.employee_name,
-                                                   str(self.employee_num), ret_str_bnft)
-        return ret_str
+        out.write('\n{} | ID #: {} | (*{})'.format(self.employee_name,
+                                                   str(self.employee_num), ret_str_bnft))
+
+    def _watch(self, watcher):
+        """Register an object whose reindex(employee) is called every time
+        an indexed field (id, shift, account number) is set."""
+        self.__watchers += (watcher,)
+
+    def _unwatch(self, watcher):
+        self.__watchers = tuple(w for w in self.__watchers if w is not watcher)
+
+    def _notify(self):
+        for watcher in self.__watchers:
+            watcher.reindex(self)
+
+    def _invalidate(self, field):
+        """Called by the setters of the pay inputs. Classes caching values
+        derived from field drop them here."""
+        pass
 
     def determine_benefits(self, number):
         """Determine if an employee can get benefits.
@@ -156,6 +325,9 @@ class Shift(Enum):
 
 
 class ProductionWorker(Employee):
+    # fields are declared in Employee.__slots__
+    __slots__ = ()
+
     # class constant
     DEFAULT_SHIFT = Shift.DAY
     DEFAULT_HOURLY_RAY_RATE = 1
@@ -176,6 +348,7 @@ class ProductionWorker(Employee):
         """
 
         # Derived Class attributes
+        self._Employee__watchers = ()
         self.employee_shift = shift
         self.hourly_pay_rate = rate
         self.hours_worked = hour
@@ -206,12 +379,14 @@ class ProductionWorker(Employee):
         Returns:
             Shift: Set instance variable shift to input shift if valid. Set to default shift otherwise.
         """
-        if shift in Shift:
+        if type(shift) is Shift:
             self.__shift = shift
         elif type(shift) is int and (1 <= shift <= 3):
             self.__shift = Shift(shift)
         else:
             self.__shift = self.DEFAULT_SHIFT
+        if self._Employee__watchers:
+            self._notify()
 
     @hourly_pay_rate.setter
     def hourly_pay_rate(self, rate):
@@ -224,6 +399,7 @@ class ProductionWorker(Employee):
             self.__rate = rate
         else:
             self.__rate = self.DEFAULT_HOURLY_RAY_RATE
+        self._invalidate('hourly_pay_rate')
 
     @hours_worked.setter
     def hours_worked(self, hour):
@@ -236,6 +412,7 @@ class ProductionWorker(Employee):
             self.__hour = hour
         else:
             self.__hour = self.DEFAULT_HOURS_WORKED
+        self._invalidate('hours_worked')
 
     def gross_pay(self, rate, hour):
         """ Calculate the gross pay for production workers.
@@ -248,28 +425,24 @@ class ProductionWorker(Employee):
             int: Return rate * hour for valid input. Zero otherwise.
         """
         if self.validate_rate(rate) and self.validate_hour(hour):
-            return rate * hour
+            return worker_pay(rate, hour)[0]
         else:
             return 0
 
     # stringizer and console output
-    def __str__(self):
-        """ Call Base Class to_string to display name and id. Concatenate
+    def write_to(self, out):
+        """ Call Base Class write_to to display name and id. Write
         Production Workers' shift, hourly rate, hours worked and gross pay. 
 
-        Returns:
-            str: Return a string.
+        Args:
+            out (file): Writable text stream
         """
-        me = super().__thisclass__
-        mro = super().__self_class__.__mro__
-        if len(mro) - mro.index(me) > 2:
-            ret_str = super().__str__()
-        ret_str += "\nTitle: Production Worker \nShift: {} \nWage: ${} /hr \nHours Worked: {} hrs this week \nGross Pay: ${}\n" \
-                   "".format(str(self.employee_shift.name),
-                             str(self.hourly_pay_rate), str(self.hours_worked),
-                             str(self.gross_pay(self.hourly_pay_rate,
-                                                self.hours_worked)))
-        return ret_str
+        super().write_to(out)
+        out.write("\nTitle: Production Worker \nShift: {} \nWage: ${} /hr \nHours Worked: {} hrs this week \nGross Pay: ${}\n"
+                  "".format(str(self.employee_shift.name),
+                            str(self.hourly_pay_rate), str(self.hours_worked),
+                            str(self.gross_pay(self.hourly_pay_rate,
+                                               self.hours_worked))))
 
     # helper functions
     @classmethod
@@ -302,7 +475,46 @@ class ProductionWorker(Employee):
 # ================= Derived Class: Shift Supervisor Class =================
 
 
+class Roster:
+    """Fixed-capacity list of the production workers under a supervisor.
+    Appending is amortized O(1); the capacity is only checked by the owner,
+    so IsFull keeps counting ShiftSupervisor.number_of_workers."""
+    __slots__ = ('capacity', 'workers')
+
+    # reasons reported by ShiftSupervisor.add_many()
+    WRONG_SHIFT = 'shift'
+    FULL = 'full'
+
+    def __init__(self, capacity):
+        """
+        Instance variable:
+        capacity: Hold the max number of workers
+        workers: Hold the workers added so far
+        """
+        self.capacity = capacity
+        self.workers = []
+
+    def append(self, worker):
+        self.workers.append(worker)
+
+    @property
+    def size(self):
+        return self.capacity
+
+    def __len__(self):
+        return len(self.workers)
+
+    def __iter__(self):
+        return iter(self.workers)
+
+    def __getitem__(self, index):
+        return self.workers[index]
+
+
 class ShiftSupervisor(Employee):
+    # fields are declared in Employee.__slots__
+    __slots__ = ()
+
     DEFAULT_SALARY = 50000
     MIN_SALARY = 50000
     MAX_SALARY = 200000
@@ -324,11 +536,13 @@ class ShiftSupervisor(Employee):
         num_workers: Hold the number of workers under the supervisor
         """
 
+        self._Employee__watchers = ()
         self.annual_salary = salary
         self.supervisor_shift = shift
-        self.emp_array = numpy.empty(
-            shape=(1, self.valid_arr_capacity(emp_array)),
-            dtype=ProductionWorker)
+        # the roster is only allocated when the first worker is added
+        self.__capacity = self.valid_arr_capacity(emp_array)
+        self.__roster = None
+        self.__bonus_period = None
         self.number_of_workers = num_worker
         super().__init__(*args, **kwargs)
 
@@ -341,6 +555,12 @@ class ShiftSupervisor(Employee):
     def supervisor_shift(self):
         return self.__shift
 
+    @property
+    def emp_array(self):
+        if self.__roster is None:
+            self.__roster = Roster(self.__capacity)
+        return self.__roster
+
     # @property
     # def add_to_array(self):
     #     return self.emp_array
@@ -361,6 +581,7 @@ class ShiftSupervisor(Employee):
             self.__salary = salary
         else:
             self.__salary = self.DEFAULT_SALARY
+        self._invalidate('annual_salary')
 
     @supervisor_shift.setter
     def supervisor_shift(self, shift):
@@ -375,6 +596,8 @@ class ShiftSupervisor(Employee):
             self.__shift = Shift(shift)
         else:
             self.__shift = self.DEFAULT_SHIFT
+        if self._Employee__watchers:
+            self._notify()
 
     @number_of_workers.setter
     def number_of_workers(self, num_worker):
@@ -382,29 +605,56 @@ class ShiftSupervisor(Employee):
             self.__num_worker = self.DEFAULT_NUM_OF_WORKERS
         else:
             self.__num_worker = num_worker
+        self._invalidate('number_of_workers')
 
     def add_to_array(self, production_worker):
         """ Determine if the production worker should be added to the
         supervisor array. Raise error if the array is full. If it is not full
-        and is in shift, append to the supervisor array and then delete the
-        extra length of 1. Increment self.num_worker by 1."""
+        and is in shift, append to the supervisor array. Increment
+        self.num_worker by 1."""
         if not self.shift_valid(production_worker):
             return
-        try:
-            if self.emp_array.size <= self.number_of_workers:
-                raise IsFull
-        except ValueError:
-            return
-
-        # Append production worker to the array
-        self.emp_array = numpy.append(self.emp_array, production_worker)
+        if self.is_full():
+            raise IsFull
 
-        # Remove extra space = 1, because using append method will increase
-        # size by 1
-        self.emp_array = numpy.delete(self.emp_array, 0)
+        # Append production worker to the roster in amortized O(1)
+        self.emp_array.append(production_worker)
         # update worker's number
         self.number_of_workers += 1
 
+    def add_many(self, workers):
+        """Add production workers in bulk, in one pass over the input.
+
+        Args:
+            workers (iterable): Production workers to add
+
+        Returns:
+            list: (worker, reason) pairs for the workers that were not added.
+            The reason is Roster.WRONG_SHIFT or Roster.FULL.
+        """
+        rejected = []
+        room = self.room_left
+        for worker in workers:
+            if not self.shift_valid(worker):
+                rejected.append((worker, Roster.WRONG_SHIFT))
+            elif room <= 0:
+                rejected.append((worker, Roster.FULL))
+            else:
+                self.emp_array.append(worker)
+                self.number_of_workers += 1
+                room -= 1
+        return rejected
+
+    def is_full(self):
+        """Check if the supervisor array has no room for another worker."""
+        return self.__capacity <= self.number_of_workers
+
+    @property
+    def room_left(self):
+        """Number of workers that can still be added, counted the same way
+        as add_to_array."""
+        return max(self.__capacity - self.number_of_workers, 0)
+
     # helper functions
     @classmethod
     def valid_salary(cls, salary):
@@ -437,57 +687,188 @@ class ShiftSupervisor(Employee):
         """ Check if the worker is in the same shift as supervisor."""
         return worker_obj.employee_shift is self.supervisor_shift
 
-    def bonus(self):
-        """Check if the supervisor get bonus or not."""
-        if self.number_of_workers > self.WORKERS_REQUIRED:
-            self.annual_salary = self.annual_salary + self.BONUS_ADD_TO_SALARY
+    @property
+    def bonus_eligible(self):
+        """True if the supervisor has more than WORKERS_REQUIRED workers."""
+        return self.number_of_workers > self.WORKERS_REQUIRED
+
+    @property
+    def bonus_period(self):
+        return self.__bonus_period
+
+    def bonus(self, period=None):
+        """Check if the supervisor get bonus or not. With a period, the bonus
+        is added to the salary only once for that period.
+
+        Args:
+            period (hashable): Pay period the bonus is paid for
+
+        Returns:
+            bool: True for eligible. False otherwise.
+        """
+        if self.bonus_eligible:
+            if period is None or period != self.__bonus_period:
+                self.annual_salary = self.annual_salary + self.BONUS_ADD_TO_SALARY
+                self.__bonus_period = period
             return True
         else:
             return False
 
-    def __str__(self):
-        """Call Base Class to_string to display employee's name, employee's
-        id and benefits status. """
-        me = super().__thisclass__
-        mro = super().__self_class__.__mro__
-        if len(mro) - mro.index(me) > 2:
-            ret_str = super().__str__()
-        ret_str += "\nTitle: Shift Supervisor \nAnnual Salary ${} \nShift: {} \n{} workers in their " \
-                   "shift\n".format(self.annual_salary,
-                                    self.supervisor_shift.name,
-                                    self.number_of_workers)
+    def write_to(self, out):
+        """Call Base Class write_to to display employee's name, employee's
+        id and benefits status. Each worker of the roster is written in turn.
 
-        # Check if there's any worker under a supervisor
-        # List Comprehension to obtain only Non-None type element
-        the_array = numpy.array([i for i in self.emp_array if i is not None])
-        if self.number_of_workers > 0:
-            for i in range(len(the_array)):
-                ret_str += "\nWorkers {}\n{}".format(i+1, the_array[i])
+        Args:
+            out (file): Writable text stream
+        """
+        super().write_to(out)
+        out.write("\nTitle: Shift Supervisor \nAnnual Salary ${} \nShift: {} \n{} workers in their "
+                  "shift\n".format(self.annual_salary,
+                                   self.supervisor_shift.name,
+                                   self.number_of_workers))
 
-        return ret_str
+        # Check if there's any worker under a supervisor
+        if self.number_of_workers > 0 and self.__roster is not None:
+            for i, worker in enumerate(self.__roster):
+                out.write("\nWorkers {}\n".format(i+1))
+                worker.write_to(out)
 
 
 # ====================== END OF SHIFT SUPERVISOR CLASS ======================
 
 # ====================== START OF 401K CLASS ======================
 class Member401k(ShiftSupervisor, ProductionWorker):
+    # one slot per derived value, holding STALE until _derived() computes it
+    __slots__ = ('account_num', 'amount', 'is_supervisor', '__gross_pay',
+                 '__monthly_pay', '__max_match', '__actual_match',
+                 '__bonus_eligible')
+
     # constant
     DEFAULT_401K_ACCT_NUM = '123-4567890'
     DEFAULT_MIN_AMOUNT = 0
     DEFAULT_MAX_AMOUNT = 5000
     LEN_LETTERS = 3
     DEFAULT_MATCH = 0.05
+    # row layout of trusted_many()
+    TRUSTED_FIELDS = ('name', 'number', 'shift', 'rate', 'hour', 'salary',
+                      'num_worker', 'account_num', 'amount', 'is_supervisor')
+    # marks a derived value that has to be recomputed
+    STALE = object()
+    DERIVED_SLOTS = {name: '_Member401k__' + name
+                     for name in ('gross_pay', 'monthly_pay', 'max_match',
+                                  'actual_match', 'bonus_eligible')}
 
     # constructor
     def __init__(self, *args, account_num=DEFAULT_401K_ACCT_NUM,
                  amount=DEFAULT_MIN_AMOUNT, **kwargs):
+        # read by _invalidate() while the setters run; max_match() below
+        # marks every derived value stale
+        self.is_supervisor = False
         super().__init__(*args, **kwargs)
+        # ShiftSupervisor consumes the shift keyword, give the worker side
+        # the shift it already checked
+        if 'shift' in kwargs:
+            self._ProductionWorker__shift = self._ShiftSupervisor__shift
         # 401k class attributes
-        self.is_supervisor = False
         self.account_number = account_num
-        self.max_value = self.max_match(**kwargs)
+        self.__max_match = self.max_match(**kwargs)
         self.contributed_amount = amount
-        self.actual_value = self.actual_max(amount)
+        self.__actual_match = self.actual_max(amount)
+
+    @classmethod
+    def trusted(cls, name, number, shift, rate, hour, salary, num_worker,
+                account_num, amount, is_supervisor):
+        """Build a record from values that are already valid. See
+        trusted_many()."""
+        return cls.trusted_many([(name, number, shift, rate, hour, salary,
+                                  num_worker, account_num, amount,
+                                  is_supervisor)])[0]
+
+    @classmethod
+    def trusted_many(cls, rows):
+        """Build records from values that are already valid, e.g. read back
+        from a MemberStore or a roster file. The constructor chain, the
+        validators and the setters are skipped and the fields are stored as
+        they are, so invalid values are NOT replaced by the defaults. The
+        match is computed on first read.
+
+        Args:
+            rows (iterable): Tuples of TRUSTED_FIELDS. shift is a Shift or
+                its value, account_num is formatted ('ABC-1234567').
+
+        Returns:
+            list: Member401k objects
+        """
+        new = object.__new__
+        capacity = cls.DEFAULT_CAPACITY
+        stale = cls.STALE
+        members = []
+        for (name, number, shift, rate, hour, salary, num_worker, account_num,
+             amount, is_supervisor) in rows:
+            shift = Shift(shift)
+            self = new(cls)
+            self._Employee__watchers = ()
+            self._Employee__name = name
+            self._Employee__number = number
+            self._Employee__benefits = number < Employee.BENEFIT_ID
+            self._ProductionWorker__shift = shift
+            self._ProductionWorker__rate = rate
+            self._ProductionWorker__hour = hour
+            self._ShiftSupervisor__salary = salary
+            self._ShiftSupervisor__shift = shift
+            self._ShiftSupervisor__num_worker = num_worker
+            self._ShiftSupervisor__capacity = capacity
+            self._ShiftSupervisor__roster = None
+            self._ShiftSupervisor__bonus_period = None
+            self.account_num = account_num
+            self.amount = amount
+            self.is_supervisor = is_supervisor
+            self.__gross_pay = self.__monthly_pay = self.__max_match = stale
+            self.__actual_match = self.__bonus_eligible = stale
+            members.append(self)
+        return members
+
+    def __reduce__(self):
+        """Pickle the fields as one flat tuple instead of the slots of the
+        whole hierarchy. The registries watching the record are left out.
+        max_value and actual_value are kept, since max_match() may have
+        computed them from other values than the stored fields."""
+        roster = self._ShiftSupervisor__roster
+        max_value, actual_value = self.__max_match, self.__actual_match
+        return (type(self)._from_state, ((
+            self._Employee__name, self._Employee__number,
+            self._Employee__benefits, self._ProductionWorker__shift,
+            self._ProductionWorker__rate, self._ProductionWorker__hour,
+            self._ShiftSupervisor__salary, self._ShiftSupervisor__shift,
+            self._ShiftSupervisor__num_worker,
+            self._ShiftSupervisor__capacity,
+            None if roster is None else roster.workers,
+            self._ShiftSupervisor__bonus_period, self.account_num,
+            self.amount, self.is_supervisor,
+            None if max_value is self.STALE else max_value,
+            None if actual_value is self.STALE else actual_value),))
+
+    @classmethod
+    def _from_state(cls, state):
+        """Unpickle a record written by __reduce__()."""
+        self = object.__new__(cls)
+        self._Employee__watchers = ()
+        (self._Employee__name, self._Employee__number,
+         self._Employee__benefits, self._ProductionWorker__shift,
+         self._ProductionWorker__rate, self._ProductionWorker__hour,
+         self._ShiftSupervisor__salary, self._ShiftSupervisor__shift,
+         self._ShiftSupervisor__num_worker, self._ShiftSupervisor__capacity,
+         workers, self._ShiftSupervisor__bonus_period, self.account_num,
+         self.amount, self.is_supervisor, max_value, actual_value) = state
+        self._ShiftSupervisor__roster = None
+        if workers is not None:
+            self.emp_array.workers = workers
+        self._clear_derived()
+        if max_value is not None:
+            self.__max_match = max_value
+        if actual_value is not None:
+            self.__actual_match = actual_value
+        return self
 
     # accessors
     @property
@@ -498,6 +879,42 @@ class Member401k(ShiftSupervisor, ProductionWorker):
     def get_actual_value(self):
         return self.actual_value
 
+    @property
+    def max_value(self):
+        value = self.__max_match
+        if value is self.STALE:
+            value = self._derived('max_match')
+        return value
+
+    @property
+    def actual_value(self):
+        value = self.__actual_match
+        if value is self.STALE:
+            value = self._derived('actual_match')
+        return value
+
+    @property
+    def current_gross_pay(self):
+        value = self.__gross_pay
+        if value is self.STALE:
+            value = self._derived('gross_pay')
+        return value
+
+    @property
+    def monthly_pay(self):
+        """Monthly pay shown in the report."""
+        value = self.__monthly_pay
+        if value is self.STALE:
+            value = self._derived('monthly_pay')
+        return value
+
+    @property
+    def bonus_eligible(self):
+        value = self.__bonus_eligible
+        if value is self.STALE:
+            value = self._derived('bonus_eligible')
+        return value
+
     @property
     def account_number(self):
         return self.account_num
@@ -507,6 +924,14 @@ class Member401k(ShiftSupervisor, ProductionWorker):
         return self.amount
 
     # mutators
+    @max_value.setter
+    def max_value(self, value):
+        self.__max_match = value
+
+    @actual_value.setter
+    def actual_value(self, value):
+        self.__actual_match = value
+
     @account_number.setter
     def account_number(self, account_num):
         """ Create a string combined with 3 random letters and employee's id
@@ -514,11 +939,15 @@ class Member401k(ShiftSupervisor, ProductionWorker):
         Args:
             account_num (str): employee account number
         """
-        if type(account_num) is str and len(account_num) is 10:
+        # accounts are stored as ASCII bytes in roster files
+        if (type(account_num) is str and len(account_num) is 10 and
+                account_num.isascii()):
             self.account_num = '{}-{}'.format(
                 account_num[0:3], account_num[3:])
         else:
             self.account_num = self.DEFAULT_401K_ACCT_NUM
+        if self._Employee__watchers:
+            self._notify()
 
     @contributed_amount.setter
     def contributed_amount(self, amount):
@@ -529,9 +958,9 @@ class Member401k(ShiftSupervisor, ProductionWorker):
         """
         if self.validate_contribute_amount(amount):
             self.amount = amount
-            self.actual_max(self.amount)
         else:
             self.amount = self.DEFAULT_MIN_AMOUNT
+        self._invalidate('contributed_amount')
 
     @classmethod
     def validate_contribute_amount(cls, amount):
@@ -556,21 +985,34 @@ class Member401k(ShiftSupervisor, ProductionWorker):
         """
         # local variable
         monthly_pay = 0
+        # pay looked up here and kept, so _derived() does not look it up
+        # again
+        gross = shown = self.STALE
         # check if the instantiated object is a worker or supervisor
-        # check if 'salary' in dictionary
-        if 'salary' in kwargs:
-            monthly_pay = self.annual_salary // 12
-            # mark this object as a supervisor
-            self.is_supervisor = True
-        # check if 'rate' in dictionary
+        # check if 'rate' in dictionary; it wins over 'salary'
         if 'rate' in kwargs:
             rt = kwargs.get('rate')
             hr = kwargs.get('hour')
-            monthly_pay = self.gross_pay(rt, hr) * 4
+            if self.validate_rate(rt) and self.validate_hour(hr):
+                pay, monthly_pay = worker_pay(rt, hr)
+                # the report shows the pay of the attributes, which are the
+                # same values when __init__ is the caller
+                if (rt == self.hourly_pay_rate and
+                        hr == self.hours_worked):
+                    gross, shown = pay, monthly_pay
             # mark this object as a worker
             self.is_supervisor = False
-        self.max_value = int(monthly_pay * self.DEFAULT_MATCH)
-        return self.max_value
+        # check if 'salary' in dictionary
+        elif 'salary' in kwargs:
+            shown, monthly_pay = supervisor_pay(self.annual_salary)
+            # mark this object as a supervisor
+            self.is_supervisor = True
+        # the role may have changed, so every derived value is stale
+        self._clear_derived()
+        self.__gross_pay = gross
+        self.__monthly_pay = shown
+        self.__max_match = match_of(monthly_pay, self.DEFAULT_MATCH)
+        return self.__max_match
 
     def actual_max(self, amount):
         """Set the actual value.
@@ -581,41 +1023,2766 @@ class Member401k(ShiftSupervisor, ProductionWorker):
         Returns:
             int: Actual value.
         """
-        self.actual_value = amount
+        max_value = self.max_value
         # check if the contributed amount larger than max_match value
-        if self.actual_value > self.max_value:
+        if amount > max_value:
             # if true, match the amount to max match
-            self.actual_value = self.max_value
+            self.__actual_match = max_value
         else:
             # set the actual value to the input amount
-            self.actual_value = self.actual_value
-        return int(self.actual_value)
+            self.__actual_match = amount
+        return int(self.__actual_match)
 
-    def __str__(self):
-        me = super().__thisclass__
-        mro = super().__self_class__.__mro__
-        mro1 = mro[3]
-
-        # create an Employee's __str__
-        ret_str = mro1.__str__(self)
-        # check if the object is supervisor or worker
-        if self.is_supervisor is True:
-            emp_salary = self.annual_salary / 12
+    def _invalidate(self, field):
+        """Drop the derived values computed from field. They are recomputed
+        once, on the next read. The pay of a worker comes from the rate and
+        hours, the pay of a supervisor from the salary.
+
+        Args:
+            field (str): Name of the property that was set
+        """
+        stale = self.STALE
+        if field == 'contributed_amount':
+            self.__actual_match = stale
+        elif field == 'number_of_workers':
+            self.__bonus_eligible = stale
+        elif field == 'annual_salary':
+            if self.is_supervisor:
+                self.__monthly_pay = self.__max_match = stale
+                self.__actual_match = stale
         else:
-            emp_salary = self.gross_pay(
-                self.hourly_pay_rate, self.hours_worked) * 4
-
-        ret_str += "\n401K Account #: {} \nMonthly Pay: ${} \nAmount contributed: " \
-                   "${} \nMax match: ${} \nActual Match: ${}\n".format(
-                       self.account_number, int(
-                           emp_salary), self.contributed_amount,
-                       self.get_max_match, self.get_actual_value)
-        return ret_str
+            # hourly_pay_rate or hours_worked
+            self.__gross_pay = stale
+            if not self.is_supervisor:
+                self.__monthly_pay = self.__max_match = stale
+                self.__actual_match = stale
+
+    def _clear_derived(self):
+        """Mark every derived value stale."""
+        self.__gross_pay = self.__monthly_pay = self.__max_match = self.STALE
+        self.__actual_match = self.__bonus_eligible = self.STALE
+
+    def _derived(self, name):
+        """Return a derived value, computing it if it is stale.
+
+        Args:
+            name (str): 'gross_pay', 'monthly_pay', 'max_match',
+                'actual_match' or 'bonus_eligible'
+        """
+        slot = self.DERIVED_SLOTS[name]
+        value = getattr(self, slot)
+        if value is not self.STALE:
+            return value
+        if name == 'gross_pay':
+            value = self.gross_pay(self.hourly_pay_rate, self.hours_worked)
+        elif name == 'monthly_pay':
+            # check if the object is supervisor or worker
+            #   Supervisor's monthly pay = salary / 12
+            #   Worker's monthly pay = gross pay * 4
+            if self.is_supervisor is True:
+                value = supervisor_pay(self.annual_salary)[0]
+            else:
+                value = self.current_gross_pay * 4
+        elif name == 'max_match':
+            if self.is_supervisor is True:
+                monthly_pay = supervisor_pay(self.annual_salary)[1]
+            else:
+                monthly_pay = self.current_gross_pay * 4
+            value = match_of(monthly_pay, self.DEFAULT_MATCH)
+        elif name == 'actual_match':
+            value = min(self.amount, self.max_value)
+        else:
+            value = ShiftSupervisor.bonus_eligible.fget(self)
+        setattr(self, slot, value)
+        return value
+
+    def write_to(self, out):
+        """Write the Employee header and the 401K details to a file-like
+        object.
+
+        Args:
+            out (file): Writable text stream
+        """
+        # create an Employee's header
+        Employee.write_to(self, out)
+        out.write("\n401K Account #: {} \nMonthly Pay: ${} \nAmount contributed: "
+                  "${} \nMax match: ${} \nActual Match: ${}\n".format(
+                      self.account_number, self.monthly_pay,
+                      self.contributed_amount, self.get_max_match,
+                      self.get_actual_value))
+
+    def report_fields(self):
+        """Collect the fields of the report for the CSV/JSON output.
+
+        Returns:
+            dict: REPORT_FIELDS -> value
+        """
+        return {
+            'employee_name': self.employee_name,
+            'employee_num': self.employee_num,
+            'benefits': self.get_determine_benefits(),
+            'account_number': self.account_number,
+            'monthly_pay': self.monthly_pay,
+            'contributed_amount': self.contributed_amount,
+            'max_match': self.get_max_match,
+            'actual_match': self.get_actual_value,
+        }
 
 
 # ====================== END OF 401K CLASS ======================
 
 
+# ====================== START OF REPORT WRITER ======================
+REPORT_FORMATS = ('text', 'csv', 'jsonl')
+REPORT_FIELDS = ('employee_name', 'employee_num', 'benefits',
+                 'account_number', 'monthly_pay', 'contributed_amount',
+                 'max_match', 'actual_match')
+
+
+def write_report(members, out, fmt='text', header=True):
+    """Write a report record by record to a file-like object, so the whole
+    report is never held in memory.
+
+    Args:
+        members (iterable): Member401k objects (any Employee for 'text')
+        out (file): Writable text stream
+        fmt (str): 'text' for the __str__ format, 'csv' or 'jsonl' for the
+            REPORT_FIELDS of each member
+        header (bool): Write the CSV header line
+
+    Returns:
+        int: Number of records written
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError('unknown report format: {}'.format(fmt))
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+        if header:
+            writer.writeheader()
+    for member in members:
+        if fmt == 'text':
+            member.write_to(out)
+        elif fmt == 'csv':
+            writer.writerow(member.report_fields())
+        else:
+            out.write(json.dumps(member.report_fields()))
+            out.write('\n')
+        count += 1
+    return count
+
+
+# ====================== END OF REPORT WRITER ======================
+
+
+# ====================== START OF MEMORY FOOTPRINT ======================
+def measure_record_memory(count=10000):
+    """Measure the memory used per record by each class of the hierarchy.
+       Records are built with typical values and traced with tracemalloc.
+
+    Args:
+        count (int): Number of records built per class
+
+    Returns:
+        dict: Class name -> bytes per record
+    """
+    samples = (
+        (Employee, lambda i: Employee('Marco Joseph', 1000 + i)),
+        (ProductionWorker, lambda i: ProductionWorker(
+            name='Marco Joseph', number=1000 + i, shift=Shift.DAY, rate=13,
+            hour=35)),
+        (ShiftSupervisor, lambda i: ShiftSupervisor(
+            name='Zach Mccall', number=1000 + i, salary=51680,
+            shift=Shift.NIGHT)),
+        (Member401k, lambda i: Member401k(
+            name='Marco Joseph', number=1000 + i, rate=13, hour=35,
+            amount=72)),
+    )
+    footprint = {}
+    for cls, build in samples:
+        tracemalloc.start()
+        # the list holding the records is not part of a record
+        records = [None] * count
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            records[i] = build(i % (Employee.MAX_EMPLY_NUM - 1000))
+        footprint[cls.__name__] = round(
+            (tracemalloc.get_traced_memory()[0] - before) / count, 1)
+        tracemalloc.stop()
+        del records
+    return footprint
+
+
+# ====================== END OF MEMORY FOOTPRINT ======================
+
+
+# ====================== START OF VECTORIZED VALIDATION ======================
+# range of the integer arrays the columns are converted to
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def _int_column(values):
+    """Convert a column to an integer array and flag the entries that are
+    ints. Integer arrays (e.g. memory-mapped columns) are used without a copy.
+
+    The per-object validators require ``type(value) is int``, so a float or
+    bool array never passes them. Object arrays and plain sequences (which
+    may mix ints with other types) are checked entry by entry. Python ints
+    outside int64 are flagged as not ints: they are outside the bounds of
+    every column, so the setters replace them by the default anyway.
+
+    Args:
+        values (array_like): Column of input values
+
+    Returns:
+        tuple: (integer array, bool array of entries that are ints)
+    """
+    if isinstance(values, numpy.ndarray):
+        column = values
+    else:
+        column = numpy.asarray(values, dtype=object)
+    if column.dtype.kind in 'iu':
+        return column, numpy.ones(column.shape, dtype=bool)
+    if column.dtype == object:
+        is_int = numpy.fromiter(
+            (type(value) is int and INT64_MIN <= value <= INT64_MAX
+             for value in column.ravel()),
+            dtype=bool, count=column.size).reshape(column.shape)
+        return numpy.where(is_int, column, 0).astype(numpy.int64), is_int
+    return (numpy.zeros(column.shape, dtype=numpy.int64),
+            numpy.zeros(column.shape, dtype=bool))
+
+
+def _name_column(values):
+    """Flag the entries of a column that pass Employee.validate_name."""
+    column = numpy.asarray(values, dtype=object)
+    is_valid = numpy.fromiter(
+        (type(name) is str and name.isnumeric() is False
+         for name in column.ravel()),
+        dtype=bool, count=column.size).reshape(column.shape)
+    return column, is_valid
+
+
+# column -> (validator it mirrors, bounds of an int column, name and value
+# of the default the setter falls back to)
+COLUMN_RULES = {
+    'name': ('validate_name', None,
+             'DEFAULT_NAME', Employee.DEFAULT_NAME),
+    'number': ('validate_id',
+               (Employee.MIN_EMPLY_NUM, Employee.MAX_EMPLY_NUM),
+               'DEFAULT_NUM', Employee.DEFAULT_NUM),
+    'rate': ('validate_rate',
+             (ProductionWorker.MIN_HOURLY_PAY_RATE,
+              ProductionWorker.MAX_HOURLY_PAY_RATE),
+             'DEFAULT_HOURLY_RAY_RATE',
+             ProductionWorker.DEFAULT_HOURLY_RAY_RATE),
+    'hour': ('validate_hour',
+             (ProductionWorker.MIN_HOURS_WORKED,
+              ProductionWorker.MAX_HOURS_WORKED),
+             'DEFAULT_HOURS_WORKED', ProductionWorker.DEFAULT_HOURS_WORKED),
+    'salary': ('valid_salary',
+               (ShiftSupervisor.MIN_SALARY, ShiftSupervisor.MAX_SALARY),
+               'DEFAULT_SALARY', ShiftSupervisor.DEFAULT_SALARY),
+    'amount': ('validate_contribute_amount',
+               (Member401k.DEFAULT_MIN_AMOUNT, Member401k.DEFAULT_MAX_AMOUNT),
+               'DEFAULT_MIN_AMOUNT', Member401k.DEFAULT_MIN_AMOUNT),
+}
+
+
+class ColumnValidation:
+    """Result of validate_columns().
+
+    Instance variable:
+    masks: Hold validator name -> bool array, True where the value is valid
+    values: Hold column -> array with invalid values replaced by the default
+    """
+
+    def __init__(self):
+        self.masks = {}
+        self.values = {}
+
+    def invalid_counts(self):
+        """Count the records failing each validator.
+
+        Returns:
+            dict: Validator name -> number of invalid values
+        """
+        return {rule: int(mask.size - numpy.count_nonzero(mask))
+                for rule, mask in self.masks.items()}
+
+    def fallback_counts(self):
+        """Count the records that fall back to each default.
+
+        Returns:
+            dict: Default constant name (e.g. 'DEFAULT_NUM') -> count
+        """
+        counts = self.invalid_counts()
+        return {COLUMN_RULES[column][2]: counts[COLUMN_RULES[column][0]]
+                for column in self.values}
+
+
+def validate_columns(**columns):
+    """Validate whole columns at once, following the validate_* classmethods
+    and the defaults the property setters fall back to.
+
+    Args:
+        **columns: Any of 'name', 'number', 'rate', 'hour', 'salary' and
+            'amount' as array_like
+
+    Returns:
+        ColumnValidation: Masks per validator and the defaulted values
+
+    Raises:
+        KeyError: Unknown column
+    """
+    result = ColumnValidation()
+    for column, values in columns.items():
+        rule, bounds, _, default = COLUMN_RULES[column]
+        if bounds is None:
+            values, is_valid = _name_column(values)
+        else:
+            values, is_valid = _int_column(values)
+            is_valid &= (bounds[0] <= values) & (values <= bounds[1])
+        result.masks[rule] = is_valid
+        result.values[column] = numpy.where(is_valid, values, default)
+    return result
+
+
+# ====================== END OF VECTORIZED VALIDATION ======================
+
+
+# ====================== START OF BATCH ENGINE ======================
+def batch_match(salary, rate, hour, amount, is_supervisor):
+    """Calculate the 401K match for a whole population in one vectorized pass.
+       Follows Member401k.max_match and Member401k.actual_max:
+        - Supervisor's monthly pay = salary // 12 (invalid salary uses
+          DEFAULT_SALARY, like the annual_salary setter)
+        - Worker's monthly pay = gross pay * 4 (invalid rate or hour gives a
+          gross pay of 0, like gross_pay)
+        - Max match = monthly pay * DEFAULT_MATCH
+        - Actual match = contributed amount capped at max match
+
+    Args:
+        salary (array_like): Annual salary of each member
+        rate (array_like): Hourly pay rate of each member
+        hour (array_like): Hours worked of each member
+        amount (array_like): Amount contributed by each member
+        is_supervisor (array_like): True for supervisors, False for workers
+
+    Returns:
+        tuple: (max match, actual match, monthly pay) as int64 arrays. Monthly
+        pay is the figure Member401k prints, where the worker's rate and hour
+        have already fallen back to their defaults.
+    """
+    is_supervisor = numpy.asarray(is_supervisor, dtype=bool)
+    # apply the same default rules as the property setters
+    checked = validate_columns(salary=salary, rate=rate, hour=hour)
+    salary = checked.values['salary']
+    rate = checked.values['rate']
+    hour = checked.values['hour']
+
+    # max_match works from the raw inputs through gross_pay, which gives 0
+    # when either of them is invalid
+    gross = numpy.where(checked.masks['validate_rate'] &
+                        checked.masks['validate_hour'], rate * hour, 0)
+    match_pay = numpy.where(is_supervisor, salary // 12, gross * 4)
+    max_value = (match_pay * Member401k.DEFAULT_MATCH).astype(numpy.int64)
+
+    # actual_max compares the raw amount with the max match
+    amount = numpy.asarray(amount)
+    if amount.dtype.kind not in 'iu':
+        amount = amount.astype(numpy.float64)
+    actual_value = numpy.minimum(amount, max_value).astype(numpy.int64)
+
+    # __str__ reports the pay from the (defaulted) instance attributes
+    monthly_pay = numpy.where(is_supervisor, salary // 12, rate * hour * 4)
+
+    return max_value, actual_value, monthly_pay.astype(numpy.int64)
+
+
+def batch_match_records(records):
+    """Run batch_match over a structured array.
+
+    Args:
+        records (numpy.ndarray): Structured array with the fields 'salary',
+            'rate', 'hour', 'amount' and 'is_supervisor'
+
+    Returns:
+        tuple: (max match, actual match, monthly pay) as int64 arrays
+    """
+    return batch_match(records['salary'], records['rate'], records['hour'],
+                       records['amount'], records['is_supervisor'])
+
+
+# ====================== END OF BATCH ENGINE ======================
+
+
+# ====================== START OF WEEKLY HOURS ======================
+class HoursHistory:
+    """Hours worked per week by a population of production workers, kept in
+    one array with a row per worker and a column per week. Every week is
+    checked against MIN_HOURS_WORKED/MAX_HOURS_WORKED when it is added; an
+    invalid week counts as DEFAULT_HOURS_WORKED, like the hours_worked
+    setter. Monthly pay then uses the real weeks of each month instead of
+    gross pay * 4.
+
+        history = HoursHistory(nums, rates, datetime.date(2026, 1, 5))
+        history.add_week([40, 32, 38])
+        months, gross, max_match = history.monthly()
+    """
+    # columns allocated when the array is first grown
+    INITIAL_WEEKS = 8
+    # a week belongs to the month of this day of it, the month holding most
+    # of its 7 days
+    MONTH_DAY = 3
+
+    def __init__(self, employee_nums, rates, first_week):
+        """
+        Instance variable:
+        employee_nums: Hold the employee id of each row
+        rates: Hold the hourly pay rate of each row, 0 where it is invalid
+            (gross_pay gives 0 for an invalid rate)
+        first_week: Hold the date the first week starts on
+        weeks: Hold the number of weeks added
+        hours: Hold the rows x capacity array of checked hours
+        valid: Hold the rows x capacity array, False where a week failed
+            validate_hour
+        """
+        self.employee_nums = numpy.asarray(employee_nums)
+        checked = validate_columns(rate=rates)
+        self.rates = numpy.where(checked.masks['validate_rate'],
+                                 checked.values['rate'], 0)
+        self.first_week = first_week
+        self.weeks = 0
+        self.hours = numpy.zeros((len(self.employee_nums), 0), dtype=numpy.int32)
+        self.valid = numpy.ones(self.hours.shape, dtype=bool)
+
+    def __len__(self):
+        return len(self.employee_nums)
+
+    @classmethod
+    def from_members(cls, members, first_week):
+        """Start a history for production workers (or Member401k workers).
+
+        Args:
+            members (list): Workers, in row order
+            first_week (datetime.date): Date the first week starts on
+
+        Returns:
+            HoursHistory: History without any week
+        """
+        return cls([member.employee_num for member in members],
+                   [member.hourly_pay_rate for member in members], first_week)
+
+    def add_week(self, hours):
+        """Append the hours of one week. The array grows by doubling, so
+        adding a week is amortized O(rows).
+
+        Args:
+            hours (array_like): Hours worked by each row this week
+
+        Returns:
+            int: Number of rows whose hours were invalid
+        """
+        checked = validate_columns(hour=hours)
+        if checked.values['hour'].shape != (len(self),):
+            raise ValueError('expected the hours of {} workers'.format(
+                len(self)))
+        if self.weeks == self.hours.shape[1]:
+            self._grow(max(self.weeks * 2, self.INITIAL_WEEKS))
+        self.hours[:, self.weeks] = checked.values['hour']
+        self.valid[:, self.weeks] = checked.masks['validate_hour']
+        self.weeks += 1
+        return checked.invalid_counts()['validate_hour']
+
+    def invalid_weeks(self):
+        """Number of invalid weeks of each row."""
+        return self.weeks - numpy.count_nonzero(
+            self.valid[:, :self.weeks], axis=1)
+
+    def week_months(self):
+        """Label ('YYYY-MM') of the month each week belongs to."""
+        day = datetime.timedelta(days=1)
+        return ['{:%Y-%m}'.format(self.first_week + (7 * week +
+                                                     self.MONTH_DAY) * day)
+                for week in range(self.weeks)]
+
+    def monthly(self, match=None):
+        """Gross pay and max match of every row for every month, in one
+        reduction over the weeks.
+            Monthly gross pay = hourly rate * hours of the weeks of the month
+            Max match = monthly gross pay * DEFAULT_MATCH
+
+        Args:
+            match (float): Match rate, Member401k.DEFAULT_MATCH if None
+
+        Returns:
+            tuple: (month labels, rows x months int64 gross pay, rows x months
+            int64 max match)
+        """
+        if match is None:
+            match = Member401k.DEFAULT_MATCH
+        labels = self.week_months()
+        starts = [week for week in range(self.weeks)
+                  if week == 0 or labels[week] != labels[week - 1]]
+        if not starts:
+            empty = numpy.zeros((len(self), 0), dtype=numpy.int64)
+            return [], empty, empty.copy()
+        hours = numpy.add.reduceat(self.hours[:, :self.weeks], starts, axis=1,
+                                   dtype=numpy.int64)
+        gross = hours * self.rates[:, None]
+        max_value = (gross * match).astype(numpy.int64)
+        return [labels[week] for week in starts], gross, max_value
+
+    # helper functions
+    def _grow(self, capacity):
+        hours = numpy.zeros((len(self), capacity), dtype=self.hours.dtype)
+        valid = numpy.ones((len(self), capacity), dtype=bool)
+        hours[:, :self.weeks] = self.hours[:, :self.weeks]
+        valid[:, :self.weeks] = self.valid[:, :self.weeks]
+        self.hours = hours
+        self.valid = valid
+
+
+# ====================== END OF WEEKLY HOURS ======================
+
+
+# ====================== START OF INGEST ======================
+# default number of records per batch yielded by iter_member_batches()
+INGEST_BATCH_SIZE = 10000
+
+# columns of an input record (the Member401k keyword names), the integer
+# columns and the validator guarding each column
+MEMBER_FIELDS = ('name', 'number', 'shift', 'rate', 'hour', 'salary',
+                 'num_worker', 'account_num', 'amount')
+INT_FIELDS = ('number', 'shift', 'rate', 'hour', 'salary', 'num_worker',
+              'amount')
+FIELD_RULES = {
+    'name': Employee.validate_name,
+    'number': Employee.validate_id,
+    'rate': ProductionWorker.validate_rate,
+    'hour': ProductionWorker.validate_hour,
+    'salary': ShiftSupervisor.valid_salary,
+    'amount': Member401k.validate_contribute_amount,
+}
+# rule reported for a value that can not be parsed at all
+PARSE_RULE = 'parse'
+
+
+def iter_member_rows(path, fmt=None):
+    """Read raw employee records one at a time from a CSV or JSONL file.
+       Only one line is held in memory at a time.
+
+    Args:
+        path (str): Input file
+        fmt (str): 'csv' or 'jsonl'. Taken from the file extension if None.
+
+    Returns:
+        generator: (line number, dict) pairs. A JSONL line that is not an
+        object yields None instead of a dict.
+    """
+    if fmt is None:
+        fmt = 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+    with open(path, newline='') as the_file:
+        if fmt == 'csv':
+            reader = csv.DictReader(the_file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(the_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_number, row if isinstance(row, dict) else None
+
+
+def row_to_kwargs(row):
+    """Convert a raw record into Member401k keyword arguments. Unknown columns
+    and empty values are dropped so the constructor defaults apply. Every
+    value present is checked with the validator of its column.
+
+    Args:
+        row (dict): Raw record keyed by the Member401k keyword names
+
+    Returns:
+        tuple: (kwargs, None) for a valid record, (None, rule) otherwise,
+        where rule is the name of the failing validator.
+    """
+    if row is None:
+        return None, PARSE_RULE
+    kwargs = {}
+    for key, value in row.items():
+        if key not in MEMBER_FIELDS or value is None or value == '':
+            continue
+        if key in INT_FIELDS and type(value) is str:
+            try:
+                value = int(value)
+            except ValueError:
+                rule = FIELD_RULES.get(key)
+                return None, rule.__name__ if rule else PARSE_RULE
+        kwargs[key] = value
+    for key, rule in FIELD_RULES.items():
+        if key in kwargs and not rule(kwargs[key]):
+            return None, rule.__name__
+    if 'shift' in kwargs and kwargs['shift'] in (1, 2, 3):
+        kwargs['shift'] = Shift(kwargs['shift'])
+    # name and number are required by Employee
+    kwargs.setdefault('name', Employee.DEFAULT_NAME)
+    kwargs.setdefault('number', Employee.DEFAULT_NUM)
+    return kwargs, None
+
+
+def iter_member_batches(path, batch_size=INGEST_BATCH_SIZE, fmt=None,
+                        on_reject=None):
+    """Stream validated Member401k objects in fixed-size batches. Memory is
+    bounded by batch_size whatever the size of the file.
+
+    Args:
+        path (str): Input file (CSV or JSONL)
+        batch_size (int): Number of members per batch
+        fmt (str): 'csv' or 'jsonl'. Taken from the file extension if None.
+        on_reject (callable): Called as on_reject(line number, row, rule)
+            for every record that fails a validate_* rule. Rejected records
+            are skipped when None.
+
+    Returns:
+        generator: Lists of at most batch_size Member401k objects
+    """
+    batch = []
+    for line_number, row in iter_member_rows(path, fmt):
+        kwargs, rule = row_to_kwargs(row)
+        if rule is not None:
+            if on_reject is not None:
+                on_reject(line_number, row, rule)
+            continue
+        batch.append(Member401k(**kwargs))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_members(path, **kwargs):
+    """Stream validated Member401k objects one at a time.
+
+    Args:
+        path (str): Input file (CSV or JSONL)
+        **kwargs: Passed on to iter_member_batches()
+
+    Returns:
+        generator: Member401k objects
+    """
+    for batch in iter_member_batches(path, **kwargs):
+        yield from batch
+
+
+# ====================== END OF INGEST ======================
+
+
+# ====================== START OF PROJECTION ======================
+PROJECTION_RETURN = 0.06
+PROJECTION_VOLATILITY = 0.15
+PROJECTION_CHUNK_SIZE = 256
+
+
+def simulate_returns(paths, months, annual_return=PROJECTION_RETURN,
+                     annual_volatility=PROJECTION_VOLATILITY, seed=None):
+    """Draw monthly market returns for Monte Carlo paths. Every employee of
+    a path sees the same market.
+
+    Args:
+        paths (int): Number of return paths
+        months (int): Number of months
+        annual_return (float): Expected yearly return
+        annual_volatility (float): Yearly standard deviation of the return
+        seed (int): Seed of the random generator
+
+    Returns:
+        numpy.ndarray: (paths, months) monthly returns, above -100%
+    """
+    rng = numpy.random.default_rng(seed)
+    returns = rng.normal(annual_return / 12, annual_volatility / 12 ** 0.5,
+                         size=(paths, months))
+    return numpy.maximum(returns, -0.99)
+
+
+def growth_factors(returns, years):
+    """Compound the returns at every year end.
+       - growth: value of 1 invested at the start
+       - annuity: value of 1 deposited at the end of every month
+
+    Args:
+        returns (numpy.ndarray): (paths, months) monthly returns
+        years (int): Number of years, at most months // 12
+
+    Returns:
+        tuple: (growth, annuity), both (paths, years)
+    """
+    growth = numpy.cumprod(1 + returns, axis=1)
+    # deposit k is worth growth[T] / growth[k] at month T
+    annuity = growth * numpy.cumsum(1 / growth, axis=1)
+    year_ends = numpy.arange(1, years + 1) * 12 - 1
+    return growth[:, year_ends], annuity[:, year_ends]
+
+
+def project_balances(deposit, years, paths=1000, initial_balance=0,
+                     chunk_size=PROJECTION_CHUNK_SIZE, returns=None, **market):
+    """Project 401K balances of a population over Monte Carlo return paths.
+    Employees are processed chunk_size at a time, so memory is bounded by
+    chunk_size * paths * years whatever the population size.
+
+    Args:
+        deposit (array_like): Monthly deposit of each employee (amount
+            contributed + actual match)
+        years (int): Number of years
+        paths (int): Number of return paths
+        initial_balance (array_like): Balance of each employee today
+        chunk_size (int): Number of employees per yielded chunk
+        returns (numpy.ndarray): (paths, months) monthly returns. Drawn with
+            simulate_returns(**market) if None.
+        **market: annual_return, annual_volatility and seed
+
+    Returns:
+        generator: (index of the first employee, (chunk, paths, years)
+        balances at every year end)
+    """
+    deposit = numpy.asarray(deposit, dtype=numpy.float64)
+    initial_balance = numpy.broadcast_to(
+        numpy.asarray(initial_balance, dtype=numpy.float64), deposit.shape)
+    if returns is None:
+        returns = simulate_returns(paths, years * 12, **market)
+    growth, annuity = growth_factors(returns, years)
+    for start in range(0, len(deposit), chunk_size):
+        stop = start + chunk_size
+        balances = (deposit[start:stop, None, None] * annuity +
+                    initial_balance[start:stop, None, None] * growth)
+        yield start, balances
+
+
+def project_population(salary, rate, hour, amount, is_supervisor, years,
+                       percentiles=(5, 50, 95), **kwargs):
+    """Project the balances of a population whose deposits follow the
+    Member401k rules: the valid contributed amount plus the actual match
+    from batch_match(). Only the percentiles across paths are kept.
+
+    Args:
+        salary, rate, hour, amount, is_supervisor (array_like): Columns as
+            for batch_match()
+        years (int): Number of years
+        percentiles (tuple): Percentiles across the paths to keep
+        **kwargs: Passed on to project_balances()
+
+    Returns:
+        numpy.ndarray: (employees, len(percentiles), years) balances
+    """
+    _, actual_value, _ = batch_match(salary, rate, hour, amount,
+                                     is_supervisor)
+    contributed = validate_columns(amount=amount).values['amount']
+    deposit = contributed + actual_value
+    result = numpy.empty((len(deposit), len(percentiles), years))
+    for start, balances in project_balances(deposit, years, **kwargs):
+        result[start:start + len(balances)] = numpy.percentile(
+            balances, percentiles, axis=1).transpose(1, 0, 2)
+    return result
+
+
+# ====================== END OF PROJECTION ======================
+
+
+# ====================== START OF SCENARIOS ======================
+# policy constant -> class it is read from when a scenario leaves it out
+SCENARIO_PARAMETERS = {
+    'DEFAULT_MATCH': Member401k,
+    'DEFAULT_MAX_AMOUNT': Member401k,
+    'BENEFIT_ID': Employee,
+    'BONUS_ADD_TO_SALARY': ShiftSupervisor,
+}
+# employees evaluated at a time; memory is bounded by scenarios * chunk
+SCENARIO_CHUNK_SIZE = 65536
+
+
+def policy_grid(**values):
+    """Every combination of policy values.
+
+        policy_grid(DEFAULT_MATCH=[0.04, 0.05], BENEFIT_ID=[5000, 8000])
+
+    Args:
+        **values: Policy constant -> list of values
+
+    Returns:
+        list: One dict of policy constant -> value per scenario
+    """
+    names = list(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values.values())]
+
+
+def population_columns(members):
+    """Collect the columns evaluate_scenarios() needs from Member401k
+    objects. The objects hold values that already went through the setters.
+    Their match ('max_match', 'actual_match') and whether the supervisor
+    bonus is already in the salary ('bonus_paid') are taken as well.
+
+    Returns:
+        dict: Column name -> NumPy array
+    """
+    fields = {
+        'number': lambda m: m.employee_num,
+        'shift': lambda m: member_shift(m).value,
+        'rate': lambda m: m.hourly_pay_rate,
+        'hour': lambda m: m.hours_worked,
+        'salary': lambda m: m.annual_salary,
+        'num_worker': lambda m: m.number_of_workers,
+        'amount': lambda m: m.contributed_amount,
+        'max_match': lambda m: m.max_value,
+        'actual_match': lambda m: m.actual_value,
+    }
+    columns = {name: numpy.fromiter(map(field, members), dtype=numpy.int64,
+                                    count=len(members))
+               for name, field in fields.items()}
+    columns['is_supervisor'] = numpy.fromiter(
+        (member.is_supervisor for member in members), dtype=bool,
+        count=len(members))
+    columns['bonus_paid'] = numpy.fromiter(
+        (member.is_supervisor and member.bonus_period is not None
+         for member in members), dtype=bool, count=len(members))
+    return columns
+
+
+def evaluate_scenarios(columns, scenarios, chunk_size=SCENARIO_CHUNK_SIZE,
+                       benefits_only=False):
+    """Monthly employer match cost of a population under several policies,
+    all of them in one broadcast pass (scenarios x employees). The class
+    constants are only read, never changed. Per scenario:
+        - Supervisors with more than WORKERS_REQUIRED workers get
+          BONUS_ADD_TO_SALARY, as in apply_bonus(); a supervisor the bonus
+          would push past MAX_SALARY is not paid. Where 'bonus_paid' is
+          set the salary already holds the current bonus, which the
+          scenario bonus replaces.
+        - Max match = monthly pay * DEFAULT_MATCH, monthly pay as in
+          batch_match()
+        - A contribution above DEFAULT_MAX_AMOUNT falls back to
+          DEFAULT_MIN_AMOUNT, like the contributed_amount setter, and the
+          actual match is the contribution capped at the max match
+        - Employees with number < BENEFIT_ID have benefits
+          (determine_benefits). Member401k pays the match to everyone, so
+          BENEFIT_ID only limits the cost with benefits_only.
+        - Where the columns carry 'actual_match' and neither the match
+          policy nor the salary of an employee changes in a scenario, the
+          stored match is used. Member401k computes it from the constructor
+          arguments, which the fields do not always give back.
+    With the current policy and benefits_only False, the cost of the
+    columns of population_columns() is the sum of actual_value over the
+    Member401k objects after apply_bonus(), whether the columns were taken
+    before or after it.
+
+    Args:
+        columns (dict): 'number', 'salary', 'rate', 'hour', 'amount' and
+            'is_supervisor' as array_like, plus optional 'shift' (Shift
+            values, DAY if missing), 'num_worker' (0 if missing),
+            'bonus_paid' (False if missing) and 'actual_match', e.g. from
+            synthetic_population() or population_columns()
+        scenarios (list): Dicts of policy constant -> value, e.g. from
+            policy_grid(). Constants left out keep their class value.
+        chunk_size (int): Employees evaluated at a time
+        benefits_only (bool): Only employees with benefits get the match, a
+            policy rule Member401k does not have
+
+    Returns:
+        list: One dict per scenario with 'policy' (all four constants),
+        'members' (employees with benefits), 'bonus_skipped' (supervisors
+        not paid the bonus because of MAX_SALARY), 'total_match' and
+        'per_shift' (shift name -> match)
+
+    Raises:
+        ValueError: A scenario sets an unknown constant
+    """
+    for scenario in scenarios:
+        for name in scenario:
+            if name not in SCENARIO_PARAMETERS:
+                raise ValueError('unknown policy constant: {}'.format(name))
+    # scenario values as columns, so they broadcast against the employees
+    policy = {name: numpy.array([scenario.get(name, getattr(cls, name))
+                                 for scenario in scenarios])[:, None]
+              for name, cls in SCENARIO_PARAMETERS.items()}
+
+    size = len(columns['number'])
+    members = numpy.zeros(len(scenarios), dtype=numpy.int64)
+    skipped = numpy.zeros(len(scenarios), dtype=numpy.int64)
+    per_shift = numpy.zeros((len(scenarios), len(Shift) + 1),
+                            dtype=numpy.int64)
+    for start in range(0, size, chunk_size):
+        chunk = {name: values[start:start + chunk_size]
+                 for name, values in columns.items()}
+        count = len(chunk['number'])
+        checked = validate_columns(salary=chunk['salary'], rate=chunk['rate'],
+                                   hour=chunk['hour'])
+        is_supervisor = numpy.asarray(chunk['is_supervisor'], dtype=bool)
+
+        # determine_benefits compares the raw id
+        number, is_int = _int_column(chunk['number'])
+        benefits = is_int & (number < policy['BENEFIT_ID'])
+
+        # bonus, skipped where the new salary would fail valid_salary
+        workers, is_int = _int_column(chunk.get('num_worker',
+                                                numpy.zeros(count, dtype=int)))
+        paid = is_supervisor & numpy.asarray(
+            chunk.get('bonus_paid', numpy.zeros(count, dtype=bool)),
+            dtype=bool)
+        bonus_eligible = paid | (is_supervisor & is_int &
+                                 (workers > ShiftSupervisor.WORKERS_REQUIRED))
+        stored_salary = checked.values['salary']
+        salary = numpy.where(
+            paid, stored_salary - ShiftSupervisor.BONUS_ADD_TO_SALARY,
+            stored_salary)
+        raised = salary + policy['BONUS_ADD_TO_SALARY']
+        raised_valid = ((ShiftSupervisor.MIN_SALARY <= raised) &
+                        (raised <= ShiftSupervisor.MAX_SALARY))
+        salary = numpy.where(bonus_eligible & raised_valid, raised, salary)
+        skipped += numpy.count_nonzero(bonus_eligible & ~raised_valid, axis=1)
+
+        gross = numpy.where(checked.masks['validate_rate'] &
+                            checked.masks['validate_hour'],
+                            checked.values['rate'] * checked.values['hour'], 0)
+        match_pay = numpy.where(is_supervisor, salary // 12, gross * 4)
+        max_value = (match_pay * policy['DEFAULT_MATCH']).astype(numpy.int64)
+
+        amount, is_int = _int_column(chunk['amount'])
+        amount = numpy.where(
+            is_int & (Member401k.DEFAULT_MIN_AMOUNT <= amount) &
+            (amount <= policy['DEFAULT_MAX_AMOUNT']),
+            amount, Member401k.DEFAULT_MIN_AMOUNT)
+        cost = numpy.minimum(amount, max_value)
+        if 'actual_match' in chunk:
+            same_policy = (
+                (policy['DEFAULT_MATCH'] == Member401k.DEFAULT_MATCH) &
+                (policy['DEFAULT_MAX_AMOUNT'] ==
+                 Member401k.DEFAULT_MAX_AMOUNT))
+            cost = numpy.where(same_policy & (salary == stored_salary),
+                               numpy.asarray(chunk['actual_match']), cost)
+        if benefits_only:
+            cost = numpy.where(benefits, cost, 0)
+
+        shift, is_int = _int_column(chunk.get(
+            'shift', numpy.full(count, ProductionWorker.DEFAULT_SHIFT.value)))
+        shift = numpy.where(is_int & (1 <= shift) & (shift <= len(Shift)),
+                            shift, ProductionWorker.DEFAULT_SHIFT.value)
+        members += numpy.count_nonzero(benefits, axis=1)
+        for value in range(1, len(Shift) + 1):
+            per_shift[:, value] += cost[:, shift == value].sum(axis=1)
+
+    results = []
+    for i in range(len(scenarios)):
+        results.append({
+            'policy': {name: policy[name][i, 0].item()
+                       for name in SCENARIO_PARAMETERS},
+            'members': int(members[i]),
+            'bonus_skipped': int(skipped[i]),
+            'total_match': int(per_shift[i].sum()),
+            'per_shift': {shift.name: int(per_shift[i, shift.value])
+                          for shift in Shift},
+        })
+    return results
+
+
+# ====================== END OF SCENARIOS ======================
+
+
+# ====================== START OF ACCOUNT ALLOCATOR ======================
+# number of distinct letter prefixes of an account number
+ACCOUNT_LETTER_CODES = 26 ** Member401k.LEN_LETTERS
+# digits of the employee id part of an account number
+ACCOUNT_ID_DIGITS = 10 - Member401k.LEN_LETTERS
+
+
+def _account_keys(accounts):
+    """Turn account numbers ('ABC-0001234' or 'ABC0001234') into
+    id * ACCOUNT_LETTER_CODES + letter code. Malformed ones are skipped."""
+    keys = []
+    for account in accounts:
+        account = account.replace('-', '')
+        letters = account[:Member401k.LEN_LETTERS]
+        digits = account[Member401k.LEN_LETTERS:]
+        if (len(account) != 10 or not digits.isdigit() or
+                not (letters.isascii() and letters.isalpha() and
+                     letters.isupper())):
+            continue
+        code = 0
+        for letter in letters:
+            code = code * 26 + ord(letter) - ord('A')
+        keys.append(int(digits) * ACCOUNT_LETTER_CODES + code)
+    return numpy.array(keys, dtype=numpy.int64)
+
+
+def allocate_account_numbers(employee_nums, existing=(), seed=None):
+    """Allocate unique 401K account numbers in one vectorized pass: 3 random
+    letters followed by the employee id on 7 digits, the form the
+    account_number setter expects. Members sharing an id walk a random
+    affine sequence over the letter codes (stride coprime with their
+    count), so they never collide and no number is drawn twice; codes
+    already taken are skipped without retrying.
+
+    Args:
+        employee_nums (array_like): Employee id of each member (invalid ids
+            fall back to DEFAULT_NUM, like the employee_num setter)
+        existing (iterable): Account numbers already in use
+        seed (int): Seed of the random generator, for reproducible runs
+
+    Returns:
+        list: One 10-character account number per member
+
+    Raises:
+        ValueError: More members and existing accounts share an id than
+            there are letter codes
+    """
+    rng = numpy.random.default_rng(seed)
+    nums = validate_columns(number=employee_nums).values['number']
+    nums = nums.astype(numpy.int64)
+    if nums.size == 0:
+        return []
+
+    # group the members by id
+    order = numpy.argsort(nums, kind='stable')
+    group_ids, group_sizes = numpy.unique(nums[order], return_counts=True)
+    taken = _account_keys(existing)
+    taken_ids, taken_counts = numpy.unique(taken // ACCOUNT_LETTER_CODES,
+                                           return_counts=True)
+    group_taken = numpy.zeros(len(group_ids), dtype=numpy.int64)
+    found = numpy.isin(group_ids, taken_ids)
+    group_taken[found] = taken_counts[numpy.isin(taken_ids, group_ids)]
+    if numpy.any(group_sizes + group_taken > ACCOUNT_LETTER_CODES):
+        raise ValueError('more than {} account numbers for one employee id'
+                         .format(ACCOUNT_LETTER_CODES))
+
+    # candidate j of a group is (offset + j * stride) % ACCOUNT_LETTER_CODES;
+    # a group needs as many candidates as members plus taken codes
+    candidates = group_sizes + group_taken
+    strides = numpy.arange(1, ACCOUNT_LETTER_CODES)
+    strides = strides[numpy.gcd(strides, ACCOUNT_LETTER_CODES) == 1]
+    offset = rng.integers(0, ACCOUNT_LETTER_CODES, len(group_ids))
+    stride = rng.choice(strides, len(group_ids))
+    group = numpy.repeat(numpy.arange(len(group_ids)), candidates)
+    starts = numpy.cumsum(candidates) - candidates
+    j = numpy.arange(group.size) - starts[group]
+    codes = (offset[group] + j * stride[group]) % ACCOUNT_LETTER_CODES
+    keys = group_ids[group] * ACCOUNT_LETTER_CODES + codes
+
+    # keep the first free candidates of every group
+    free = ~numpy.isin(keys, taken)
+    free_rank = numpy.cumsum(free)
+    free_rank -= numpy.concatenate(([0], free_rank[starts[1:] - 1]))[group]
+    keep = free & (free_rank <= group_sizes[group])
+    codes = numpy.empty(nums.size, dtype=numpy.int64)
+    codes[order] = keys[keep] % ACCOUNT_LETTER_CODES
+
+    # spell the accounts as ASCII bytes: 3 letters then 7 digits
+    chars = numpy.empty((nums.size, 10), dtype=numpy.uint8)
+    for i in range(Member401k.LEN_LETTERS):
+        power = 26 ** (Member401k.LEN_LETTERS - 1 - i)
+        chars[:, i] = ord('A') + codes // power % 26
+    for i in range(ACCOUNT_ID_DIGITS):
+        power = 10 ** (ACCOUNT_ID_DIGITS - 1 - i)
+        chars[:, Member401k.LEN_LETTERS + i] = ord('0') + nums // power % 10
+    return chars.view('S10').ravel().astype('U10').tolist()
+
+
+def assign_account_numbers(members, existing=(), seed=None):
+    """Give every member still on DEFAULT_401K_ACCT_NUM a unique account
+    number from allocate_account_numbers().
+
+    Args:
+        members (list): Member401k objects
+        existing (iterable): Other account numbers already in use
+        seed (int): Seed of the random generator
+
+    Returns:
+        int: Number of members given a new account number
+    """
+    default = Member401k.DEFAULT_401K_ACCT_NUM
+    pending = [member for member in members
+               if member.account_number == default]
+    in_use = itertools.chain(
+        existing, (member.account_number for member in members
+                   if member.account_number != default))
+    accounts = allocate_account_numbers(
+        [member.employee_num for member in pending], in_use, seed)
+    for member, account in zip(pending, accounts):
+        member.account_number = account
+    return len(pending)
+
+
+# ====================== END OF ACCOUNT ALLOCATOR ======================
+
+
+# ====================== START OF ROSTER ASSIGNMENT ======================
+# A balancing policy takes the free places of the supervisors of a shift and
+# the number of workers to place, and returns the supervisor index of each
+# placed worker, in worker order. Workers past the end are the overflow.
+def fill_first(rooms, count):
+    """Fill each supervisor up before moving on to the next one."""
+    slots = []
+    for i, room in enumerate(rooms):
+        if len(slots) >= count:
+            break
+        slots.extend([i] * min(room, count - len(slots)))
+    return slots
+
+
+def round_robin(rooms, count):
+    """Deal the workers out one per supervisor in turn."""
+    rooms = list(rooms)
+    slots = []
+    active = [i for i, room in enumerate(rooms) if room > 0]
+    while active and len(slots) < count:
+        still_open = []
+        for i in active:
+            if len(slots) >= count:
+                break
+            slots.append(i)
+            rooms[i] -= 1
+            if rooms[i] > 0:
+                still_open.append(i)
+        active = still_open
+    return slots
+
+
+ROSTER_POLICIES = {
+    'fill_first': fill_first,
+    'round_robin': round_robin,
+}
+
+
+def assign_roster(workers, supervisors, policy='fill_first'):
+    """Assign workers to the supervisors of their shift in one linear pass:
+    workers and supervisors are bucketed by Shift, and each bucket of
+    workers is spread over the free places of its supervisors by the policy.
+
+    Args:
+        workers (iterable): Production workers (or worker Member401k)
+        supervisors (iterable): Shift supervisors (or supervisor Member401k)
+        policy (str or callable): Name from ROSTER_POLICIES or a function
+            policy(rooms, count) -> supervisor index per placed worker
+
+    Returns:
+        list: Workers left unassigned, in input order per shift
+    """
+    if not callable(policy):
+        policy = ROSTER_POLICIES[policy]
+    by_shift = {shift: ([], []) for shift in Shift}
+    for worker in workers:
+        by_shift[worker.employee_shift][0].append(worker)
+    for supervisor in supervisors:
+        by_shift[supervisor.supervisor_shift][1].append(supervisor)
+
+    overflow = []
+    for shift_workers, shift_supervisors in by_shift.values():
+        rooms = [supervisor.room_left for supervisor in shift_supervisors]
+        slots = policy(rooms, len(shift_workers))
+        placed = [[] for _ in shift_supervisors]
+        for worker, i in zip(shift_workers, slots):
+            placed[i].append(worker)
+        for supervisor, team in zip(shift_supervisors, placed):
+            overflow.extend(worker for worker, _ in supervisor.add_many(team))
+        overflow.extend(shift_workers[len(slots):])
+    return overflow
+
+
+# ====================== END OF ROSTER ASSIGNMENT ======================
+
+
+# ====================== START OF BONUS PASS ======================
+def apply_bonus(members, period):
+    """Pay the supervisor bonus for a period to every eligible supervisor
+    (number_of_workers > WORKERS_REQUIRED) and total the members per shift.
+    A supervisor is paid at most once per period, so running the pass again
+    for the same period changes nothing. Member401k supervisors get their
+    match recomputed from the new salary. A supervisor whose salary would
+    go past MAX_SALARY is not paid (the annual_salary setter would reset it
+    to DEFAULT_SALARY) and is returned instead.
+
+    Args:
+        members (list): Member401k objects (or plain employees)
+        period (hashable): Pay period, e.g. '2026-10'
+
+    Returns:
+        tuple: (number of supervisors paid by this call, dict of shift name
+        -> {'headcount', 'total_salary', 'total_match'}, list of the
+        eligible supervisors skipped because of MAX_SALARY)
+    """
+    is_supervisor = numpy.fromiter(
+        (isinstance(member, ShiftSupervisor) and
+         getattr(member, 'is_supervisor', True) for member in members),
+        dtype=bool, count=len(members))
+    workers = numpy.fromiter(
+        (member.number_of_workers if supervisor else 0
+         for member, supervisor in zip(members, is_supervisor)),
+        dtype=numpy.int64, count=len(members))
+    eligible = is_supervisor & (workers > ShiftSupervisor.WORKERS_REQUIRED)
+
+    paid = 0
+    skipped = []
+    for i in numpy.flatnonzero(eligible).tolist():
+        member = members[i]
+        if member.bonus_period == period:
+            continue
+        if not member.valid_salary(member.annual_salary +
+                                   member.BONUS_ADD_TO_SALARY):
+            skipped.append(member)
+            continue
+        member.bonus(period)
+        paid += 1
+
+    shifts = numpy.fromiter((member_shift(member).value for member in members),
+                            dtype=numpy.int64, count=len(members))
+    # yearly pay: the salary of supervisors, 52 weeks of gross pay of workers
+    salary = numpy.fromiter(
+        (member.annual_salary if supervisor else
+         member.gross_pay(member.hourly_pay_rate, member.hours_worked) * 52
+         for member, supervisor in zip(members, is_supervisor)),
+        dtype=numpy.int64, count=len(members))
+    match = numpy.fromiter(
+        (getattr(member, 'actual_value', 0) for member in members),
+        dtype=numpy.int64, count=len(members))
+    size = len(Shift) + 1
+    headcount = numpy.bincount(shifts, minlength=size)
+    total_salary = numpy.bincount(shifts, salary, minlength=size)
+    total_match = numpy.bincount(shifts, match, minlength=size)
+    aggregates = {shift.name: {'headcount': int(headcount[shift.value]),
+                               'total_salary': int(total_salary[shift.value]),
+                               'total_match': int(total_match[shift.value])}
+                  for shift in Shift}
+    return paid, aggregates, skipped
+
+
+# ====================== END OF BONUS PASS ======================
+
+
+# ====================== START OF EMPLOYEE REGISTRY ======================
+def member_shift(member):
+    """Shift an employee works in: the supervisor shift for supervisors and
+    the employee shift for workers."""
+    if getattr(member, 'is_supervisor', isinstance(member, ShiftSupervisor)):
+        return member.supervisor_shift
+    return member.employee_shift
+
+
+class EmployeeRegistry:
+    """In-memory collection of Member401k records indexed by employee id,
+    401K account number and shift, with a sorted index of employee ids for
+    range queries. Ids and account numbers are not unique (invalid values
+    fall back to DEFAULT_NUM and DEFAULT_401K_ACCT_NUM), so every index maps
+    a key to a bucket of records. The records tell the registry when an
+    indexed field is set, so the indexes follow the property setters."""
+
+    def __init__(self, members=()):
+        """
+        Instance variable:
+        keys: Hold the (id, account number, shift) each record is indexed by
+        by_num: Hold employee id -> bucket
+        by_account: Hold account number -> bucket
+        by_shift: Hold shift -> bucket
+        sorted_nums: Hold the distinct employee ids in ascending order
+        """
+        self.keys = {}
+        self.by_num = {}
+        self.by_account = {}
+        self.by_shift = {shift: {} for shift in Shift}
+        self.sorted_nums = []
+        for member in members:
+            self.add(member)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(list(self.keys))
+
+    def __contains__(self, member):
+        return member in self.keys
+
+    def add(self, member):
+        """Add a record and index it. Adding a record twice does nothing."""
+        if member in self.keys:
+            return
+        self._index(member)
+        member._watch(self)
+
+    def remove(self, member):
+        """Remove a record from the registry and its indexes.
+
+        Raises:
+            KeyError: The record is not in the registry
+        """
+        self._unindex(member)
+        member._unwatch(self)
+
+    def reindex(self, member):
+        """Move a record to the buckets of its current field values. Called
+        by the record's setters."""
+        if self.keys.get(member) != self._key_of(member):
+            self._unindex(member)
+            self._index(member)
+
+    # queries
+    def find(self, employee_num):
+        """Return the records with an employee id."""
+        return list(self.by_num.get(employee_num, ()))
+
+    def find_account(self, account_number):
+        """Return the records with a 401K account number."""
+        return list(self.by_account.get(account_number, ()))
+
+    def in_shift(self, shift):
+        """Return the records working in a shift."""
+        return list(self.by_shift[shift])
+
+    def id_range(self, low, high):
+        """Return the records with low <= employee id < high, ordered by id.
+
+        Args:
+            low (int): Smallest id
+            high (int): Id past the last one
+
+        Returns:
+            list: Member401k records
+        """
+        start = bisect.bisect_left(self.sorted_nums, low)
+        stop = bisect.bisect_left(self.sorted_nums, high)
+        found = []
+        for num in self.sorted_nums[start:stop]:
+            found.extend(self.by_num[num])
+        return found
+
+    def with_benefits(self):
+        """Return the records below Employee.BENEFIT_ID, ordered by id."""
+        return self.id_range(Employee.MIN_EMPLY_NUM, Employee.BENEFIT_ID)
+
+    # helper functions
+    @staticmethod
+    def _key_of(member):
+        return member.employee_num, member.account_number, member_shift(member)
+
+    def _index(self, member):
+        num, account, shift = key = self._key_of(member)
+        self.keys[member] = key
+        if num not in self.by_num:
+            self.by_num[num] = {}
+            bisect.insort(self.sorted_nums, num)
+        # dicts are used as ordered sets, so removal is O(1)
+        self.by_num[num][member] = None
+        self.by_account.setdefault(account, {})[member] = None
+        self.by_shift[shift][member] = None
+
+    def _unindex(self, member):
+        num, account, shift = self.keys.pop(member)
+        del self.by_num[num][member]
+        if not self.by_num[num]:
+            del self.by_num[num]
+            del self.sorted_nums[bisect.bisect_left(self.sorted_nums, num)]
+        del self.by_account[account][member]
+        if not self.by_account[account]:
+            del self.by_account[account]
+        del self.by_shift[shift][member]
+
+
+# ====================== END OF EMPLOYEE REGISTRY ======================
+
+
+# ====================== START OF DELTA PROCESSING ======================
+def member_inputs(member):
+    """Fields the report row of a member is computed from, apart from the
+    employee id it is keyed by."""
+    return (member.employee_name, member.is_supervisor,
+            member.hourly_pay_rate, member.hours_worked, member.annual_salary,
+            member.contributed_amount, member.account_number)
+
+
+def _by_num(members):
+    """Map employee id -> member.
+
+    Raises:
+        ValueError: Two members share an employee id
+    """
+    by_num = {}
+    for member in members:
+        if by_num.setdefault(member.employee_num, member) is not member:
+            raise ValueError('duplicate employee id: {}'.format(
+                member.employee_num))
+    return by_num
+
+
+def period_results(members):
+    """Report rows of a pay period, the base a ChangeSet is applied to.
+
+    Args:
+        members (iterable): Member401k objects with distinct employee ids
+
+    Returns:
+        dict: employee id -> report_fields()
+    """
+    return {num: member.report_fields()
+            for num, member in _by_num(members).items()}
+
+
+class ChangeSet:
+    """Difference between the report rows of two pay periods. Only the
+    fields that changed are kept, so applying it to the previous period's
+    results gives the current period's results."""
+
+    def __init__(self):
+        """
+        Instance variable:
+        added: Hold employee id -> report row of the new members
+        changed: Hold employee id -> {field: new value}
+        removed: Hold the employee ids that are gone
+        """
+        self.added = {}
+        self.changed = {}
+        self.removed = []
+
+    def __len__(self):
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def apply(self, results):
+        """Bring the results of the previous period up to date, in place.
+
+        Args:
+            results (dict): employee id -> report row, e.g. from
+                period_results()
+
+        Returns:
+            dict: results
+        """
+        for num in self.removed:
+            del results[num]
+        for num, fields in self.changed.items():
+            results[num] = dict(results[num], **fields)
+        results.update(self.added)
+        return results
+
+
+def diff_snapshots(previous, current):
+    """Compare two pay-period snapshots by employee id. Only the added
+    members and the members whose inputs changed have their report row, and
+    so their match, computed; the others are compared by input fields only.
+
+    Args:
+        previous (iterable): Member401k objects of the previous period
+        current (iterable): Member401k objects of this period
+
+    Returns:
+        ChangeSet: Changes from the previous to this period
+
+    Raises:
+        ValueError: Two members of a snapshot share an employee id
+    """
+    before = _by_num(previous)
+    after = _by_num(current)
+    changes = ChangeSet()
+    changes.removed = [num for num in before if num not in after]
+    for num, member in after.items():
+        old = before.get(num)
+        if old is None:
+            changes.added[num] = member.report_fields()
+        elif member_inputs(old) != member_inputs(member):
+            old_fields = old.report_fields()
+            fields = {name: value
+                      for name, value in member.report_fields().items()
+                      if old_fields[name] != value}
+            if fields:
+                changes.changed[num] = fields
+    return changes
+
+
+# ====================== END OF DELTA PROCESSING ======================
+
+
+# ====================== START OF INSTRUMENTATION ======================
+class Instrumentation:
+    """Opt-in call counters, latency histograms and default-fallback counters
+    for the hot paths. Nothing is wrapped until enable() is called, so a
+    disabled instrumentation costs nothing; disable() puts the original
+    methods back.
+
+        with Instrumentation() as probe:
+            ...
+        print(json.dumps(probe.snapshot()))
+    """
+    # methods timed while enabled
+    TIMED = (
+        (Member401k, '__init__'), (ShiftSupervisor, '__init__'),
+        (ProductionWorker, '__init__'), (Employee, '__init__'),
+        (Member401k, 'max_match'), (Member401k, 'actual_max'),
+        (ShiftSupervisor, 'add_to_array'), (Employee, '__str__'),
+    )
+    # validators timed while enabled
+    VALIDATORS = (
+        (Employee, 'validate_name'), (Employee, 'validate_id'),
+        (ProductionWorker, 'validate_rate'),
+        (ProductionWorker, 'validate_hour'),
+        (ShiftSupervisor, 'valid_salary'),
+        (Member401k, 'validate_contribute_amount'),
+    )
+    # (class, property, validator of its setter). The validators are also
+    # called outside the setters (e.g. by gross_pay), so a fallback to the
+    # default is counted by the setter, not by the validator.
+    SETTERS = (
+        (Employee, 'employee_name', 'validate_name'),
+        (Employee, 'employee_num', 'validate_id'),
+        (ProductionWorker, 'hourly_pay_rate', 'validate_rate'),
+        (ProductionWorker, 'hours_worked', 'validate_hour'),
+        (ShiftSupervisor, 'annual_salary', 'valid_salary'),
+        (Member401k, 'contributed_amount', 'validate_contribute_amount'),
+    )
+    # latency bucket i counts the calls taking less than 2**i ns
+    HISTOGRAM_BUCKETS = 40
+    # the instrumentation currently enabled, only one at a time
+    active = None
+
+    def __init__(self):
+        """
+        Instance variable:
+        calls: Hold method name -> number of calls
+        total_ns: Hold method name -> cumulative latency in nanoseconds
+        histograms: Hold method name -> calls per latency bucket
+        fallbacks: Hold validator name -> number of values its setter
+            replaced by the default
+        pay_cache: Hold '<lookup>.hits'/'<lookup>.misses' -> count of the
+            pay lookups, up to the last snapshot
+        originals: Hold (class, attribute, original) of the wrapped methods
+        """
+        self.calls = collections.Counter()
+        self.total_ns = collections.Counter()
+        self.histograms = {}
+        self.fallbacks = collections.Counter()
+        self.pay_cache = collections.Counter()
+        self.pay_cache_base = None
+        self.originals = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def enable(self):
+        """Wrap the hot paths so they report to this instrumentation.
+
+        Raises:
+            RuntimeError: Another instrumentation is already enabled
+        """
+        if Instrumentation.active is not None:
+            raise RuntimeError('instrumentation is already enabled')
+        Instrumentation.active = self
+        self.pay_cache_base = self._pay_cache_counts()
+        for cls, attr in self.TIMED:
+            self._wrap(cls, attr, False)
+        # the setters keep the unwrapped validators, so wrap them first
+        for cls, attr, validator in self.SETTERS:
+            self._wrap_setter(cls, attr, validator)
+        for cls, attr in self.VALIDATORS:
+            self._wrap(cls, attr, True)
+
+    def disable(self):
+        """Put the original methods back."""
+        self._collect_pay_cache()
+        self.pay_cache_base = None
+        while self.originals:
+            cls, attr, original = self.originals.pop()
+            setattr(cls, attr, original)
+        if Instrumentation.active is self:
+            Instrumentation.active = None
+
+    def reset(self):
+        self.calls.clear()
+        self.total_ns.clear()
+        self.histograms.clear()
+        self.fallbacks.clear()
+        self.pay_cache.clear()
+        if self.pay_cache_base is not None:
+            self.pay_cache_base = self._pay_cache_counts()
+
+    def snapshot(self):
+        """Export the collected figures as plain, JSON-serializable data.
+
+        Returns:
+            dict: 'calls' (name -> count, total_seconds, histogram of
+            bucket upper bound in ns -> calls), 'fallbacks' and 'pay_cache'
+            (hits and misses of the pay lookups while enabled)
+        """
+        self._collect_pay_cache()
+        calls = {}
+        for name, count in self.calls.items():
+            buckets = self.histograms[name]
+            calls[name] = {
+                'count': count,
+                'total_seconds': self.total_ns[name] / 1e9,
+                'histogram': {str(2 ** i): n for i, n in enumerate(buckets)
+                              if n},
+            }
+        return {'calls': calls, 'fallbacks': dict(self.fallbacks),
+                'pay_cache': dict(self.pay_cache)}
+
+    def merge(self, snapshot):
+        """Add a snapshot (e.g. from a worker process) to these figures."""
+        for name, figures in snapshot['calls'].items():
+            self.calls[name] += figures['count']
+            self.total_ns[name] += int(figures['total_seconds'] * 1e9)
+            buckets = self.histograms.setdefault(
+                name, [0] * self.HISTOGRAM_BUCKETS)
+            for bound, n in figures['histogram'].items():
+                buckets[int(bound).bit_length() - 1] += n
+        self.fallbacks.update(snapshot['fallbacks'])
+        self.pay_cache.update(snapshot.get('pay_cache', {}))
+
+    # helper functions
+    @staticmethod
+    def _pay_cache_counts():
+        counts = collections.Counter()
+        for name, stats in pay_cache_stats().items():
+            counts[name + '.hits'] = stats['hits']
+            counts[name + '.misses'] = stats['misses']
+        return counts
+
+    def _collect_pay_cache(self):
+        """Move the pay lookup hits and misses since the last call into
+        pay_cache."""
+        if self.pay_cache_base is None:
+            return
+        counts = self._pay_cache_counts()
+        counts.subtract(self.pay_cache_base)
+        self.pay_cache.update(+counts)
+        self.pay_cache_base = self._pay_cache_counts()
+
+    def _wrap(self, cls, attr, is_validator):
+        original = vars(cls)[attr]
+        func = original.__func__ if is_validator else original
+        name = '{}.{}'.format(cls.__name__, attr)
+        calls = self.calls
+        total_ns = self.total_ns
+        buckets = self.histograms.setdefault(
+            name, [0] * self.HISTOGRAM_BUCKETS)
+        last_bucket = self.HISTOGRAM_BUCKETS - 1
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            elapsed = clock() - start
+            calls[name] += 1
+            total_ns[name] += elapsed
+            buckets[min(elapsed.bit_length(), last_bucket)] += 1
+            return result
+
+        setattr(cls, attr, classmethod(wrapper) if is_validator else wrapper)
+        self.originals.append((cls, attr, original))
+
+    def _wrap_setter(self, cls, attr, validator):
+        """Count the values a property setter replaces by its default."""
+        original = vars(cls)[attr]
+        check = vars(cls)[validator].__func__
+        name = '{}.{}'.format(cls.__name__, validator)
+        fallbacks = self.fallbacks
+        setter = original.fset
+
+        @functools.wraps(setter)
+        def wrapper(self, value):
+            if not check(type(self), value):
+                fallbacks[name] += 1
+            setter(self, value)
+
+        setattr(cls, attr, original.setter(wrapper))
+        self.originals.append((cls, attr, original))
+
+
+# ====================== END OF INSTRUMENTATION ======================
+
+
+# ====================== START OF BINARY ROSTER ======================
+# fixed record layout of the on-disk roster, see roster_dtype()
+ROSTER_FIELDS = [
+    ('number', '<i4'),
+    ('shift', 'u1'),
+    ('rate', '<i4'),
+    ('hour', '<i4'),
+    ('salary', '<i4'),
+    ('amount', '<i4'),
+    ('account', 'S11'),
+    ('is_supervisor', '?'),
+    ('max_match', '<i8'),
+    ('actual_match', '<i8'),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def roster_dtype():
+    """NumPy structured dtype of ROSTER_FIELDS."""
+    return numpy.dtype(ROSTER_FIELDS)
+
+
+def members_to_records(members):
+    """Pack Member401k objects into a ROSTER_FIELDS structured array.
+
+    Args:
+        members (iterable): Member401k objects
+
+    Returns:
+        numpy.ndarray: One record per member
+    """
+    return numpy.array(
+        [(member.employee_num, member_shift(member).value,
+          member.hourly_pay_rate, member.hours_worked, member.annual_salary,
+          member.contributed_amount, member.account_number.encode('ascii'),
+          member.is_supervisor, member.max_value, member.actual_value)
+         for member in members], dtype=roster_dtype())
+
+
+def save_roster(path, members, count=None, chunk_size=INGEST_BATCH_SIZE):
+    """Write members to a binary roster file (.npy with ROSTER_FIELDS). The
+    file is filled chunk by chunk through a memory map.
+
+    Args:
+        path (str): Output file
+        members (iterable): Member401k objects
+        count (int): Number of members. Needed to stream an iterator;
+            the members are collected first if None.
+        chunk_size (int): Number of members packed at a time
+
+    Returns:
+        int: Number of records written
+    """
+    if count is None:
+        members = list(members)
+        count = len(members)
+    roster = numpy.lib.format.open_memmap(path, mode='w+',
+                                          dtype=roster_dtype(),
+                                          shape=(count,))
+    written = 0
+    for chunk in chunked(members, chunk_size):
+        roster[written:written + len(chunk)] = members_to_records(chunk)
+        written += len(chunk)
+    roster.flush()
+    del roster
+    return written
+
+
+def open_roster(path, mode='r'):
+    """Memory-map a binary roster file. Columns such as roster['salary']
+    are views on the file, so batch computations read it without a copy.
+
+    Args:
+        path (str): Roster file written by save_roster()
+        mode (str): mmap mode, 'r' or 'r+'
+
+    Returns:
+        numpy.memmap: ROSTER_FIELDS records
+
+    Raises:
+        ValueError: The file does not hold ROSTER_FIELDS records
+    """
+    roster = numpy.load(path, mmap_mode=mode)
+    if roster.dtype != roster_dtype():
+        raise ValueError('{} is not a roster file'.format(path))
+    return roster
+
+
+def roster_match(roster):
+    """Match of every record of a (mapped) roster. The max and actual match
+    are the ones the members held when saved; only the monthly pay, which
+    __str__ derives from the stored fields, is recomputed.
+
+    Returns:
+        tuple: (max match, actual match, monthly pay) as int64 arrays
+    """
+    # max_match() reads the constructor kwargs, so the fields alone do not
+    # give back the stored match
+    monthly_pay = batch_match_records(roster)[2]
+    return (numpy.array(roster['max_match'], dtype=numpy.int64),
+            numpy.array(roster['actual_match'], dtype=numpy.int64),
+            monthly_pay)
+
+
+def materialize(roster, index, name=Employee.DEFAULT_NAME):
+    """Build the Member401k object of one roster record.
+
+    Args:
+        roster (numpy.ndarray): ROSTER_FIELDS records
+        index (int): Record number
+        name (str): Employee name, which the roster does not store
+
+    Returns:
+        Member401k: Employee of the record
+    """
+    # save_roster() stores the fields after the setters checked them
+    (number, shift, rate, hour, salary, amount, account, is_supervisor,
+     max_value, actual_value) = roster[index].tolist()
+    member = Member401k.trusted(name, number, shift, rate, hour, salary,
+                                Member401k.DEFAULT_NUM_OF_WORKERS,
+                                account.decode('ascii'), amount,
+                                is_supervisor)
+    member.max_value = max_value
+    member.actual_value = actual_value
+    return member
+
+
+# ====================== END OF BINARY ROSTER ======================
+
+
+# ====================== START OF SQLITE STORE ======================
+class MemberStore:
+    """SQLite persistence for Member401k records and their match results.
+    Writes go through executemany in one transaction per call, and reads
+    iterate a cursor batch by batch, so a million records never make a
+    million commits or sit in memory at once."""
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS members ('
+        ' id INTEGER PRIMARY KEY,'
+        ' name TEXT, number INTEGER, shift INTEGER, rate INTEGER,'
+        ' hour INTEGER, salary INTEGER, num_worker INTEGER, account TEXT,'
+        ' amount INTEGER, is_supervisor INTEGER,'
+        ' monthly_pay INTEGER, max_match INTEGER, actual_match INTEGER)',
+        'CREATE INDEX IF NOT EXISTS members_number ON members (number)',
+        'CREATE INDEX IF NOT EXISTS members_account ON members (account)',
+    )
+    COLUMNS = ('name', 'number', 'shift', 'rate', 'hour', 'salary',
+               'num_worker', 'account', 'amount', 'is_supervisor',
+               'monthly_pay', 'max_match', 'actual_match')
+    INSERT = 'INSERT INTO members ({}) VALUES ({})'.format(
+        ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+    SELECT = 'SELECT {} FROM members'.format(', '.join(COLUMNS))
+    BY_NUMBER = SELECT + ' WHERE number = ? ORDER BY id'
+    BY_ACCOUNT = SELECT + ' WHERE account = ? ORDER BY id'
+    FETCH_SIZE = 10000
+
+    def __init__(self, path):
+        """
+        Instance variable:
+        connection: Hold the SQLite connection
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        with self.connection:
+            for statement in self.SCHEMA:
+                self.connection.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM members').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def save(self, members, append=False):
+        """Store members and their current match results in one
+        transaction. The stored members are replaced, so saving the
+        workforce on every run keeps one copy of it; employee ids are not
+        unique (invalid ones fall back to DEFAULT_NUM), so rows are not
+        matched up by id.
+
+        Args:
+            members (iterable): Member401k objects, consumed lazily
+            append (bool): Keep the stored members and add these
+
+        Returns:
+            int: Number of rows inserted
+        """
+        with self.connection:
+            if not append:
+                self.connection.execute('DELETE FROM members')
+            cursor = self.connection.executemany(
+                self.INSERT, (self._row_of(member) for member in members))
+        return cursor.rowcount
+
+    def clear(self):
+        """Delete every stored member."""
+        with self.connection:
+            self.connection.execute('DELETE FROM members')
+
+    def iter_rows(self, query=None, params=(), fetch_size=FETCH_SIZE):
+        """Iterate raw rows (COLUMNS order) fetch_size at a time."""
+        cursor = self.connection.execute(query or self.SELECT + ' ORDER BY id',
+                                         params)
+        rows = cursor.fetchmany(fetch_size)
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(fetch_size)
+
+    def iter_members(self, fetch_size=FETCH_SIZE):
+        """Rebuild the stored members, in insertion order."""
+        for row in self.iter_rows(fetch_size=fetch_size):
+            yield self._member_of(row)
+
+    def find(self, employee_num):
+        """Return the members with an employee id."""
+        return [self._member_of(row)
+                for row in self.iter_rows(self.BY_NUMBER, (employee_num,))]
+
+    def find_account(self, account_number):
+        """Return the members with a 401K account number."""
+        return [self._member_of(row)
+                for row in self.iter_rows(self.BY_ACCOUNT, (account_number,))]
+
+    def load_columns(self, fetch_size=FETCH_SIZE):
+        """Read the numeric columns into NumPy arrays, e.g. for
+        batch_match(). The arrays are allocated up front and filled
+        fetch_size rows at a time, so the table is never held as Python
+        tuples all at once.
+
+        Returns:
+            dict: Column name -> array (everything but 'name' and
+            'account')
+        """
+        names = [name for name in self.COLUMNS
+                 if name not in ('name', 'account')]
+        count = len(self)
+        table = numpy.empty((count, len(names)), dtype=numpy.int64)
+        # rows saved after the count are left out
+        cursor = self.connection.execute(
+            'SELECT {} FROM members ORDER BY id LIMIT ?'.format(
+                ', '.join(names)), (count,))
+        filled = 0
+        rows = cursor.fetchmany(fetch_size)
+        while rows:
+            table[filled:filled + len(rows)] = rows
+            filled += len(rows)
+            rows = cursor.fetchmany(fetch_size)
+        # rows deleted after the count leave the end unfilled
+        table = table[:filled]
+        columns = {name: table[:, i] for i, name in enumerate(names)}
+        columns['is_supervisor'] = columns['is_supervisor'].astype(bool)
+        return columns
+
+    # helper functions
+    @staticmethod
+    def _row_of(member):
+        return (member.employee_name, member.employee_num,
+                member_shift(member).value, member.hourly_pay_rate,
+                member.hours_worked, member.annual_salary,
+                member.number_of_workers, member.account_number,
+                member.contributed_amount, int(member.is_supervisor),
+                member.monthly_pay, member.max_value, member.actual_value)
+
+    @staticmethod
+    def _member_of(row):
+        # the stored fields went through the setters before they were saved
+        (name, number, shift, rate, hour, salary, num_worker, account,
+         amount, is_supervisor, _, max_value, actual_value) = row
+        member = Member401k.trusted(name, number, shift, rate, hour, salary,
+                                    num_worker, account, amount,
+                                    bool(is_supervisor))
+        # max_match() may have computed the saved match from other values
+        # than the stored fields (e.g. an invalid rate), so keep it
+        member.max_value = max_value
+        member.actual_value = actual_value
+        return member
+
+
+# ====================== END OF SQLITE STORE ======================
+
+
+# ====================== START OF SHARDED STORE ======================
+class ShardedStore:
+    """Member401k records shared between threads. Records are spread over
+    shards by employee id, and every shard has its own lock, so updates of
+    employees in different shards run side by side instead of queueing on
+    one global lock. A record is only touched while its shard lock is held:
+    setting a field and recomputing the match that depends on it happen
+    under one lock, so no reader sees the new amount with the old match.
+
+        store = ShardedStore(members)
+        store.contribute(1234, 200)
+        rows = store.snapshot()
+    """
+    SHARDS = 16
+    # fields update() may set; each setter validates its value
+    UPDATE_FIELDS = ('contributed_amount', 'hourly_pay_rate', 'hours_worked',
+                     'annual_salary')
+
+    def __init__(self, members=(), shards=SHARDS):
+        """
+        Instance variable:
+        shards: Hold one dict of employee id -> record per shard
+        locks: Hold the lock of each shard
+        """
+        self.shards = [{} for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        for member in members:
+            self.add(member)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def __contains__(self, employee_num):
+        shard, lock = self._shard_of(employee_num)
+        with lock:
+            return employee_num in shard
+
+    def add(self, member):
+        """Add a record under its employee id.
+
+        Raises:
+            ValueError: Another record has the same employee id
+        """
+        shard, lock = self._shard_of(member.employee_num)
+        with lock:
+            if shard.setdefault(member.employee_num, member) is not member:
+                raise ValueError('duplicate employee id: {}'.format(
+                    member.employee_num))
+
+    def remove(self, employee_num):
+        """Remove and return the record of an employee id.
+
+        Raises:
+            KeyError: No record has this employee id
+        """
+        shard, lock = self._shard_of(employee_num)
+        with lock:
+            return shard.pop(employee_num)
+
+    def read(self, employee_num):
+        """Return the report row of an employee id, read under the shard
+        lock.
+
+        Raises:
+            KeyError: No record has this employee id
+        """
+        shard, lock = self._shard_of(employee_num)
+        with lock:
+            return shard[employee_num].report_fields()
+
+    def contribute(self, employee_num, amount):
+        """Set the contributed amount of an employee and recompute the actual
+        match, atomically.
+
+        Args:
+            employee_num (int): Employee id
+            amount (int): Amount contributed
+
+        Returns:
+            dict: Report row after the update
+
+        Raises:
+            KeyError: No record has this employee id
+        """
+        return self.update(employee_num, contributed_amount=amount)
+
+    def update(self, employee_num, **fields):
+        """Set pay and contribution fields of an employee and recompute the
+        match, atomically.
+
+        Args:
+            employee_num (int): Employee id
+            **fields: Any of UPDATE_FIELDS
+
+        Returns:
+            dict: Report row after the update
+
+        Raises:
+            KeyError: No record has this employee id
+            ValueError: A field is not in UPDATE_FIELDS
+        """
+        for name in fields:
+            if name not in self.UPDATE_FIELDS:
+                raise ValueError('can not update {}'.format(name))
+        shard, lock = self._shard_of(employee_num)
+        with lock:
+            member = shard[employee_num]
+            for name, value in fields.items():
+                setattr(member, name, value)
+            # the derived values are recomputed before the lock is released
+            return member.report_fields()
+
+    def snapshot(self):
+        """Read every record at one point in time. All shard locks are taken,
+        always in shard order so two snapshots can not deadlock, and held
+        until every row is read.
+
+        Returns:
+            dict: employee id -> report row
+        """
+        with contextlib.ExitStack() as stack:
+            for lock in self.locks:
+                stack.enter_context(lock)
+            return {num: member.report_fields()
+                    for shard in self.shards for num, member in shard.items()}
+
+    # helper functions
+    def _shard_of(self, employee_num):
+        index = employee_num % len(self.shards)
+        return self.shards[index], self.locks[index]
+
+
+# ====================== END OF SHARDED STORE ======================
+
+
+# ====================== START OF MATCH SERVICE ======================
+class MatchService:
+    """Asyncio service answering 401K match queries over TCP or a Unix
+    socket. The protocol is one JSON object per line in each direction:
+
+        {"id": 7, "rate": 13, "hour": 35, "amount": 72}
+        {"id": 7, "max_match": 91, "actual_match": 72, "monthly_pay": 1820}
+
+    A query holds the Member401k keywords ('salary' for supervisors, 'rate'
+    and 'hour' for workers, 'amount'), or just 'number' to look up a record
+    of the registry (an error without a registry or for an id shared by
+    several records). {"op": "stats"} returns the latency figures. Queries
+    arriving within window seconds are answered by one batch_match() call,
+    and a connection may pipeline queries: answers come back in order."""
+    COALESCE_WINDOW = 0.002
+    MAX_BATCH = 4096
+    # number of recent latencies kept for the stats
+    LATENCY_SAMPLES = 100000
+    # pay fields of a query; other values than ints in range fall back to the
+    # defaults, like in the setters
+    PAY_FIELDS = ('salary', 'rate', 'hour')
+    SCALARS = (int, float, str, bool, type(None))
+
+    def __init__(self, registry=None, window=COALESCE_WINDOW,
+                 max_batch=MAX_BATCH):
+        """
+        Instance variable:
+        registry: Hold the EmployeeRegistry used for 'number' lookups
+        window: Hold the coalescing window in seconds
+        max_batch: Hold the number of queries flushed without waiting
+        pending: Hold the (query, future) pairs of the next batch
+        latencies: Hold the recent query latencies in seconds
+        """
+        self.registry = registry
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.flush_handle = None
+        self.latencies = collections.deque(maxlen=self.LATENCY_SAMPLES)
+        self.batches = 0
+
+    async def start(self, host='127.0.0.1', port=8401, path=None):
+        """Start listening, on a Unix socket if path is given.
+
+        Returns:
+            asyncio.Server: Running server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """Serve one connection. Queries are started as soon as they are
+        read; a second task writes the answers in request order."""
+        answers = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send(answers, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await answers.put(
+                        asyncio.ensure_future(self.answer(line)))
+            await answers.put(None)
+            await sender
+        except ConnectionError:
+            pass
+        finally:
+            sender.cancel()
+            writer.close()
+
+    async def answer(self, line):
+        """Answer one raw query line.
+
+        Returns:
+            dict: Answer
+        """
+        start = time.perf_counter()
+        try:
+            query = json.loads(line)
+            if not isinstance(query, dict):
+                raise ValueError('query is not an object')
+        except ValueError as error:
+            return {'error': str(error)}
+        if query.get('op') == 'stats':
+            return self.stats()
+
+        if 'number' in query:
+            try:
+                found = (None if self.registry is None else
+                         self.registry.find(query['number']))
+            except TypeError as error:
+                answer = {'error': str(error)}
+            else:
+                if found is None:
+                    answer = {'error': 'no roster loaded'}
+                elif not found:
+                    answer = {'error': 'unknown employee'}
+                elif len(found) > 1:
+                    # invalid ids fall back to DEFAULT_NUM and collide
+                    answer = {'error': 'ambiguous employee id'}
+                else:
+                    answer = {'max_match': found[0].max_value,
+                              'actual_match': found[0].actual_value,
+                              'monthly_pay': found[0].monthly_pay}
+        else:
+            try:
+                columns = self._columns_of(query)
+            except ValueError as error:
+                answer = {'error': str(error)}
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self.pending.append((columns, future))
+                if len(self.pending) >= self.max_batch:
+                    self._flush()
+                elif self.flush_handle is None:
+                    self.flush_handle = asyncio.get_running_loop().call_later(
+                        self.window, self._flush)
+                answer = await future
+        if 'id' in query:
+            answer['id'] = query['id']
+        self.latencies.append(time.perf_counter() - start)
+        return answer
+
+    def stats(self):
+        """Latency percentiles over the recent queries.
+
+        Returns:
+            dict: count, batches, p50 and p99 in seconds
+        """
+        samples = numpy.fromiter(self.latencies, dtype=numpy.float64)
+        p50, p99 = (numpy.percentile(samples, (50, 99)).tolist()
+                    if samples.size else (None, None))
+        return {'count': samples.size, 'batches': self.batches,
+                'p50': p50, 'p99': p99}
+
+    # helper functions
+    def _flush(self):
+        """Answer every pending query with one batch_match() call."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.batches += 1
+        # the columns were checked by _columns_of(), one query at a time
+        salary, rate, hour, amount, is_supervisor = zip(
+            *(columns for columns, _ in batch))
+        try:
+            max_value, actual_value, monthly_pay = batch_match(
+                salary, rate, hour, amount, is_supervisor)
+            answers = [{'max_match': int(max_value[i]),
+                        'actual_match': int(actual_value[i]),
+                        'monthly_pay': int(monthly_pay[i])}
+                       for i in range(len(batch))]
+        except Exception as error:
+            # never leave a client waiting on an unresolved future
+            answers = [{'error': str(error)}] * len(batch)
+        for (_, future), answer in zip(batch, answers):
+            if not future.done():
+                future.set_result(dict(answer))
+
+    @classmethod
+    def _columns_of(cls, query):
+        """Check the fields of a match query before it joins a batch.
+
+        Returns:
+            tuple: (salary, rate, hour, amount, is_supervisor)
+
+        Raises:
+            ValueError: A field can not be computed; only this query fails
+        """
+        values = []
+        for field in cls.PAY_FIELDS:
+            value = query.get(field)
+            if not isinstance(value, cls.SCALARS):
+                raise ValueError('{} must be a number'.format(field))
+            values.append(value)
+        # actual_max compares the amount with the max match, so it must be
+        # a finite number
+        amount = query.get('amount', Member401k.DEFAULT_MIN_AMOUNT)
+        try:
+            is_number = type(amount) in (int, float) and math.isfinite(amount)
+        except OverflowError:
+            is_number = False
+        if not is_number:
+            raise ValueError('amount must be a number')
+        # a query is a supervisor's the way max_match() decides it
+        is_supervisor = 'salary' in query and 'rate' not in query
+        return tuple(values) + (amount, is_supervisor)
+
+    @staticmethod
+    async def _send(answers, writer):
+        while True:
+            task = await answers.get()
+            if task is None:
+                break
+            writer.write(json.dumps(await task).encode() + b'\n')
+            await writer.drain()
+
+
+# ====================== END OF MATCH SERVICE ======================
+
+
+# ====================== START OF BENCHMARKS ======================
+BENCH_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def synthetic_population(size, seed=0, supervisor_share=0.1):
+    """Build random but valid employee columns.
+
+    Args:
+        size (int): Number of employees
+        seed (int): Seed of the random generator
+        supervisor_share (float): Fraction of supervisors
+
+    Returns:
+        dict: Column name (the Member401k keyword names plus
+        'is_supervisor') -> NumPy array
+    """
+    rng = numpy.random.default_rng(seed)
+    return {
+        'number': rng.integers(Employee.MIN_EMPLY_NUM,
+                               Employee.MAX_EMPLY_NUM + 1, size),
+        'shift': rng.integers(1, len(Shift) + 1, size),
+        'rate': rng.integers(ProductionWorker.MIN_HOURLY_PAY_RATE,
+                             ProductionWorker.MAX_HOURLY_PAY_RATE + 1, size),
+        'hour': rng.integers(ProductionWorker.MIN_HOURS_WORKED,
+                             ProductionWorker.MAX_HOURS_WORKED + 1, size),
+        'salary': rng.integers(ShiftSupervisor.MIN_SALARY,
+                               ShiftSupervisor.MAX_SALARY + 1, size),
+        'amount': rng.integers(Member401k.DEFAULT_MIN_AMOUNT,
+                               Member401k.DEFAULT_MAX_AMOUNT + 1, size),
+        'is_supervisor': rng.random(size) < supervisor_share,
+    }
+
+
+def member_kwargs(columns, supervisor=None):
+    """Turn population columns into Member401k keyword arguments.
+
+    Args:
+        columns (dict): Columns from synthetic_population()
+        supervisor (bool): Build only supervisors (True) or only workers
+            (False). The is_supervisor column decides when None.
+
+    Returns:
+        list: One dict of keyword arguments per employee
+    """
+    # the validators require Python ints, not NumPy scalars
+    plain = {key: values.tolist() for key, values in columns.items()}
+    records = []
+    for i in range(len(plain['number'])):
+        common = {'name': 'Employee {}'.format(i),
+                  'number': plain['number'][i],
+                  'shift': Shift(plain['shift'][i]),
+                  'amount': plain['amount'][i]}
+        is_supervisor = plain['is_supervisor'][i] if supervisor is None \
+            else supervisor
+        if is_supervisor:
+            common['salary'] = plain['salary'][i]
+        else:
+            common['rate'] = plain['rate'][i]
+            common['hour'] = plain['hour'][i]
+        records.append(common)
+    return records
+
+
+# Each case takes the population columns, does its untimed setup and returns
+# the callable to time.
+def _bench_construct_workers(columns):
+    records = member_kwargs(columns, supervisor=False)
+    return lambda: [Member401k(**kwargs) for kwargs in records]
+
+
+def _bench_construct_supervisors(columns):
+    records = member_kwargs(columns, supervisor=True)
+    return lambda: [Member401k(**kwargs) for kwargs in records]
+
+
+def _bench_construct_trusted(columns):
+    plain = {key: values.tolist() for key, values in columns.items()}
+    rows = [(name, number, shift, rate, hour, salary, 0,
+             Member401k.DEFAULT_401K_ACCT_NUM, amount, is_supervisor)
+            for name, number, shift, rate, hour, salary, amount, is_supervisor
+            in zip(itertools.repeat('Employee'), plain['number'],
+                   plain['shift'], plain['rate'], plain['hour'],
+                   plain['salary'], plain['amount'], plain['is_supervisor'])]
+    return lambda: Member401k.trusted_many(rows)
+
+
+def _bench_pickle(columns):
+    members = [Member401k(**kwargs) for kwargs in member_kwargs(columns)]
+    return lambda: pickle.loads(pickle.dumps(members,
+                                             pickle.HIGHEST_PROTOCOL))
+
+
+def _bench_match(columns):
+    records = member_kwargs(columns)
+    members = [Member401k(**kwargs) for kwargs in records]
+
+    def run():
+        for member, kwargs in zip(members, records):
+            member.max_match(**kwargs)
+            member.actual_max(kwargs['amount'])
+    return run
+
+
+def _bench_batch_match(columns):
+    return lambda: batch_match(columns['salary'], columns['rate'],
+                               columns['hour'], columns['amount'],
+                               columns['is_supervisor'])
+
+
+def _bench_add_to_array(columns):
+    workers = [ProductionWorker(name='Worker', number=number, shift=Shift.DAY,
+                                rate=rate, hour=hour)
+               for number, rate, hour in zip(columns['number'].tolist(),
+                                             columns['rate'].tolist(),
+                                             columns['hour'].tolist())]
+    supervisor = ShiftSupervisor(name='Supervisor', number=1000,
+                                 shift=Shift.DAY, emp_array=len(workers))
+
+    def run():
+        for worker in workers:
+            supervisor.add_to_array(worker)
+    return run
+
+
+def _bench_str(columns):
+    members = [Member401k(**kwargs) for kwargs in member_kwargs(columns)]
+    return lambda: [str(member) for member in members]
+
+
+def measure_startup(runs=10):
+    """Time complete single-employee runs of this script ('calc'), from
+    interpreter start to exit, and check that NumPy stays unloaded.
+
+    Args:
+        runs (int): Number of runs
+
+    Returns:
+        dict: runs, min_seconds, median_seconds and numpy_imported
+    """
+    # run as a module so the compiled bytecode cache is used
+    folder, script = os.path.split(os.path.abspath(__file__))
+    command = [sys.executable, '-m', os.path.splitext(script)[0], 'calc',
+               '--rate', '13', '--hour', '35', '--amount', '72']
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, cwd=folder,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    trace = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:],
+                           check=True, cwd=folder, capture_output=True,
+                           text=True)
+    return {
+        'runs': runs,
+        'min_seconds': timings[0],
+        'median_seconds': timings[len(timings) // 2],
+        'numpy_imported': any(line.rstrip().endswith('| numpy')
+                              for line in trace.stderr.splitlines()),
+    }
+
+
+BENCH_CASES = {
+    'construct_workers': _bench_construct_workers,
+    'construct_supervisors': _bench_construct_supervisors,
+    'construct_trusted': _bench_construct_trusted,
+    'max_match_actual_max': _bench_match,
+    'batch_match': _bench_batch_match,
+    'add_to_array': _bench_add_to_array,
+    'str': _bench_str,
+    'pickle_round_trip': _bench_pickle,
+}
+
+
+def run_benchmarks(sizes=BENCH_SIZES, cases=None, seed=0):
+    """Time the hot paths on synthetic populations. Each case runs once
+    untraced for the timing and once under tracemalloc for the peak memory.
+    The startup time of a single-employee run is measured as well.
+
+    Args:
+        sizes (iterable): Population sizes
+        cases (iterable): Names from BENCH_CASES, all of them if None
+        seed (int): Seed of the synthetic populations
+
+    Returns:
+        dict: Environment, startup figures and one result per (case, size)
+    """
+    results = []
+    for size in sizes:
+        columns = synthetic_population(size, seed)
+        for name in cases or BENCH_CASES:
+            setup = BENCH_CASES[name]
+            run = setup(columns)
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+
+            run = setup(columns)
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del run
+
+            results.append({
+                'case': name,
+                'size': size,
+                'seconds': seconds,
+                'records_per_second': size / seconds if seconds else None,
+                'peak_bytes': peak,
+            })
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'startup': measure_startup(),
+        'pay_cache': pay_cache_stats(),
+        'results': results,
+    }
+
+
+# ====================== END OF BENCHMARKS ======================
+
+
+# ====================== START OF BATCH CLI ======================
+# default number of input records handed to a worker process at a time
+BATCH_CHUNK_SIZE = 5000
+
+
+def process_rows(rows, fmt, profile=False):
+    """Compute the 401K match for a chunk of raw records and render them.
+       Runs inside the worker processes of run_batch().
+
+    Args:
+        rows (list): (line number, row) pairs from iter_member_rows()
+        fmt (str): Output format, one of REPORT_FORMATS
+        profile (bool): Instrument the chunk
+
+    Returns:
+        tuple: (rendered text, number of members written,
+        list of (line number, row, rule) rejects, Instrumentation snapshot
+        or None)
+    """
+    probe = Instrumentation() if profile else None
+    with probe or contextlib.nullcontext():
+        members = []
+        rejects = []
+        for line_number, row in rows:
+            kwargs, rule = row_to_kwargs(row)
+            if rule is None:
+                members.append(Member401k(**kwargs))
+            else:
+                rejects.append((line_number, row, rule))
+        out = io.StringIO()
+        count = write_report(members, out, fmt, header=False)
+    return (out.getvalue(), count, rejects,
+            probe.snapshot() if profile else None)
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def ordered_map(executor, fn, iterable, window):
+    """Like executor.map() but only keeps window tasks in flight, so a long
+    input is never loaded at once. Results come back in input order.
+
+    Args:
+        executor (Executor): Pool running the tasks
+        fn (callable): Function applied to every item
+        iterable (iterable): Items
+        window (int): Max number of submitted but not yet returned tasks
+
+    Returns:
+        generator: fn(item) for every item, in input order
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_batch(in_path, out_path, workers=1, fmt='csv',
+              chunk_size=BATCH_CHUNK_SIZE, reject_path=None, in_fmt=None,
+              profile_path=None):
+    """Compute the 401K match of every record of a file and write the
+    results. The input is split into chunks spread across worker processes,
+    and the results are merged back in input order.
+
+    Args:
+        in_path (str): Input file (CSV or JSONL)
+        out_path (str): Output file
+        workers (int): Number of worker processes. 1 runs in this process.
+        fmt (str): Output format, one of REPORT_FORMATS
+        chunk_size (int): Number of records per chunk
+        reject_path (str): JSONL file for the rejected records, or None
+        in_fmt (str): Input format, taken from the file extension if None
+        profile_path (str): JSON file for the Instrumentation snapshot of
+            the whole run (merged across worker processes), or None
+
+    Returns:
+        tuple: (number of members written, number of records rejected)
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError('unknown report format: {}'.format(fmt))
+    chunks = chunked(iter_member_rows(in_path, in_fmt), chunk_size)
+    task = functools.partial(process_rows, fmt=fmt,
+                             profile=profile_path is not None)
+    totals = Instrumentation()
+    written = rejected = 0
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(out_path, 'w', newline=''))
+        reject_file = None
+        if reject_path is not None:
+            reject_file = stack.enter_context(open(reject_path, 'w'))
+        if workers > 1:
+            executor = stack.enter_context(
+                futures.ProcessPoolExecutor(max_workers=workers))
+            results = ordered_map(executor, task, chunks, workers * 2)
+        else:
+            results = map(task, chunks)
+
+        if fmt == 'csv':
+            csv.DictWriter(out, fieldnames=REPORT_FIELDS).writeheader()
+        for text, count, rejects, snapshot in results:
+            out.write(text)
+            written += count
+            rejected += len(rejects)
+            if snapshot is not None:
+                totals.merge(snapshot)
+            if reject_file is None:
+                continue
+            for line_number, row, rule in rejects:
+                reject_file.write(json.dumps(
+                    {'line': line_number, 'rule': rule, 'row': row}))
+                reject_file.write('\n')
+    if profile_path is not None:
+        with open(profile_path, 'w') as out:
+            json.dump(totals.snapshot(), out, indent=2)
+    return written, rejected
+
+
+def cli(argv):
+    """Run the non-interactive command line.
+
+    Args:
+        argv (list): Command line arguments without the program name
+
+    Returns:
+        int: Exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog='401K.py', description='Worker and Supervisor 401K Calculator')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser(
+        'batch', help='compute the 401K match of every record of a file')
+    batch.add_argument('input', help='CSV or JSONL file of employee records')
+    batch.add_argument('output', help='result file')
+    batch.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                       help='number of worker processes (default: all cores)')
+    batch.add_argument('-f', '--format', choices=REPORT_FORMATS,
+                       default='csv', help='output format (default: csv)')
+    batch.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                       help='records per chunk handed to a worker')
+    batch.add_argument('--rejects', help='JSONL file for rejected records')
+    batch.add_argument('--profile',
+                       help='JSON file for call counts, latency histograms, '
+                            'default-fallback counters and pay cache hits')
+
+    serve = commands.add_parser(
+        'serve', help='answer match queries over TCP or a Unix socket')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8401)
+    serve.add_argument('--unix', help='Unix socket path instead of TCP')
+    serve.add_argument('--roster',
+                       help='CSV/JSONL file of employees for number lookups')
+    serve.add_argument('--window', type=float,
+                       default=MatchService.COALESCE_WINDOW,
+                       help='coalescing window in seconds')
+
+    calc = commands.add_parser(
+        'calc', help='print the 401K report of one employee')
+    for field in MEMBER_FIELDS:
+        calc.add_argument('--' + field.replace('_', '-'), dest=field)
+
+    bench = commands.add_parser(
+        'bench', help='time the hot paths on synthetic populations')
+    bench.add_argument('-o', '--output', default='bench.json',
+                       help='JSON result file (default: bench.json)')
+    bench.add_argument('--sizes', type=int, nargs='+', default=BENCH_SIZES,
+                       help='population sizes')
+    bench.add_argument('--cases', nargs='+', choices=sorted(BENCH_CASES),
+                       help='cases to run (default: all)')
+    bench.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == 'calc':
+        kwargs, rule = row_to_kwargs(
+            {field: getattr(args, field) for field in MEMBER_FIELDS})
+        if rule is not None:
+            print('invalid input: {}'.format(rule), file=sys.stderr)
+            return 1
+        print(Member401k(**kwargs))
+    elif args.command == 'batch':
+        written, rejected = run_batch(
+            args.input, args.output, workers=args.workers, fmt=args.format,
+            chunk_size=args.chunk_size, reject_path=args.rejects,
+            profile_path=args.profile)
+        print('{} records written, {} rejected'.format(written, rejected))
+    elif args.command == 'serve':
+        registry = None
+        if args.roster is not None:
+            registry = EmployeeRegistry(iter_members(args.roster))
+        service = MatchService(registry, window=args.window)
+
+        async def serve_forever():
+            server = await service.start(args.host, args.port, args.unix)
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'bench':
+        report = run_benchmarks(args.sizes, args.cases, args.seed)
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+        print('startup {median_seconds:.4f} s (numpy imported: '
+              '{numpy_imported})'.format(**report['startup']))
+        for result in report['results']:
+            print('{case:<24} {size:>9} {records_per_second:>14,.0f} rec/s '
+                  '{peak_bytes:>14,} B peak'.format(**result))
+    return 0
+
+
+# ====================== END OF BATCH CLI ======================
+
+
 # ====================== Client (As a Function) ======================
 
 
@@ -682,4 +3849,6 @@ def main():
 # # ====================== End of Client (As a Function) ======================
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli(sys.argv[1:]))
     main()
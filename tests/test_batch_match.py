@@ -0,0 +1,187 @@
+import importlib.util
+import itertools
+import os
+import unittest
+import warnings
+
+import numpy
+
+# 401K.py is not a valid module name, so load it from its path
+PATH = os.path.join(os.path.dirname(__file__), os.pardir, '401K.py')
+spec = importlib.util.spec_from_file_location('member401k', PATH)
+k401 = importlib.util.module_from_spec(spec)
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', SyntaxWarning)
+    spec.loader.exec_module(k401)
+
+# valid values, values on and past the bounds, and values of the wrong type
+RATES = [0, 1, 13, 20, 21, -1, 3.0, True, '13', None, 10 ** 30, -10 ** 30]
+HOURS = [0, 35, 40, 41, -2, 35.0, False, 10 ** 30]
+SALARIES = [50000, 120000, 200000, 49999, 200001, 1.5e5, 'x', True,
+            10 ** 30]
+AMOUNTS = [0, 72, 5000, 5001, -5, 72.5, True, 10 ** 30]
+
+
+def member_match(member):
+    return member.max_value, member.actual_value, member.monthly_pay
+
+
+def batch_rows(salary, rate, hour, amount, is_supervisor):
+    columns = k401.batch_match(numpy.array(salary, dtype=object),
+                               numpy.array(rate, dtype=object),
+                               numpy.array(hour, dtype=object),
+                               numpy.array(amount, dtype=object),
+                               is_supervisor)
+    return [tuple(values) for values in zip(*(column.tolist()
+                                              for column in columns))]
+
+
+class BatchMatchTest(unittest.TestCase):
+    """batch_match() gives what Member401k computes one record at a time."""
+
+    def test_workers(self):
+        inputs = list(itertools.product(RATES, HOURS, AMOUNTS))
+        rows = batch_rows([0] * len(inputs),
+                          *map(list, zip(*inputs)), [False] * len(inputs))
+        for (rate, hour, amount), row in zip(inputs, rows):
+            with self.subTest(rate=rate, hour=hour, amount=amount):
+                member = k401.Member401k(name='Ann Lee', number=1300,
+                                         rate=rate, hour=hour, amount=amount)
+                self.assertEqual(row, member_match(member))
+
+    def test_supervisors(self):
+        inputs = list(itertools.product(SALARIES, AMOUNTS))
+        salaries, amounts = map(list, zip(*inputs))
+        rows = batch_rows(salaries, [0] * len(inputs), [0] * len(inputs),
+                          amounts, [True] * len(inputs))
+        for (salary, amount), row in zip(inputs, rows):
+            with self.subTest(salary=salary, amount=amount):
+                member = k401.Member401k(name='Sue Park', number=1300,
+                                         salary=salary, amount=amount)
+                self.assertEqual(row, member_match(member))
+
+    def test_integer_columns(self):
+        # memory-mapped rosters pass int arrays, which skip the type checks
+        rate = numpy.array([13, 21, -1, 0], dtype=numpy.int32)
+        hour = numpy.array([35, 35, 35, 41], dtype=numpy.int32)
+        amount = numpy.array([72, 72, 5001, 10], dtype=numpy.int32)
+        columns = k401.batch_match(numpy.zeros(4, dtype=numpy.int32), rate,
+                                   hour, amount, numpy.zeros(4, dtype=bool))
+        for i, row in enumerate(zip(*(column.tolist()
+                                      for column in columns))):
+            member = k401.Member401k(name='Ann Lee', number=1300,
+                                     rate=int(rate[i]), hour=int(hour[i]),
+                                     amount=int(amount[i]))
+            self.assertEqual(row, member_match(member))
+
+
+class ValidateColumnsTest(unittest.TestCase):
+    """validate_columns() follows the validate_* classmethods and the
+    defaults the setters fall back to."""
+
+    def check(self, column, values, validator, attribute, **kwargs):
+        result = k401.validate_columns(**{column: values})
+        mask = result.masks[validator.__name__].tolist()
+        defaulted = result.values[column].tolist()
+        for i, value in enumerate(values):
+            with self.subTest(column=column, value=value):
+                self.assertEqual(mask[i], validator(value))
+                fields = dict(name='Ann Lee', number=1300, **kwargs)
+                fields[column] = value
+                member = k401.Member401k(**fields)
+                self.assertEqual(defaulted[i], getattr(member, attribute))
+
+    def test_rate(self):
+        self.check('rate', RATES, k401.ProductionWorker.validate_rate,
+                   'hourly_pay_rate', hour=35)
+
+    def test_hour(self):
+        self.check('hour', HOURS, k401.ProductionWorker.validate_hour,
+                   'hours_worked', rate=13)
+
+    def test_salary(self):
+        self.check('salary', SALARIES, k401.ShiftSupervisor.valid_salary,
+                   'annual_salary')
+
+    def test_amount(self):
+        self.check('amount', AMOUNTS,
+                   k401.Member401k.validate_contribute_amount,
+                   'contributed_amount', rate=13, hour=35)
+
+    def test_number(self):
+        # determine_benefits compares the raw id, so no strings here
+        numbers = [1000, 99999, 999, 100000, 1300.0, True, 10 ** 30]
+        self.check('number', numbers, k401.Employee.validate_id,
+                   'employee_num')
+
+    def test_fallback_counts(self):
+        result = k401.validate_columns(rate=RATES)
+        self.assertEqual(result.fallback_counts(),
+                         {'DEFAULT_HOURLY_RAY_RATE':
+                          sum(not k401.ProductionWorker.validate_rate(rate)
+                              for rate in RATES)})
+
+
+class InvalidationTest(unittest.TestCase):
+    """Setting a pay input recomputes exactly the values derived from it."""
+
+    def test_worker_pay_inputs(self):
+        member = k401.Member401k(name='Ann Lee', number=1300, rate=13,
+                                 hour=35, amount=72)
+        member_match(member)
+        member.hourly_pay_rate = 20
+        self.assertEqual(member_match(member), member_match(
+            k401.Member401k(name='Ann Lee', number=1300, rate=20, hour=35,
+                            amount=72)))
+        member.hours_worked = 10
+        self.assertEqual(member.current_gross_pay, 200)
+        self.assertEqual(member_match(member), member_match(
+            k401.Member401k(name='Ann Lee', number=1300, rate=20, hour=10,
+                            amount=72)))
+        # a salary does not change the pay of a worker
+        before = member_match(member)
+        member.annual_salary = 150000
+        self.assertEqual(member_match(member), before)
+
+    def test_supervisor_pay_inputs(self):
+        member = k401.Member401k(name='Sue Park', number=1300,
+                                 salary=120000, amount=300)
+        member_match(member)
+        member.annual_salary = 180000
+        self.assertEqual(member_match(member), member_match(
+            k401.Member401k(name='Sue Park', number=1300, salary=180000,
+                            amount=300)))
+        # a rate does not change the pay of a supervisor
+        before = member_match(member)
+        member.hourly_pay_rate = 20
+        self.assertEqual(member_match(member), before)
+
+    def test_contributed_amount(self):
+        member = k401.Member401k(name='Ann Lee', number=1300, rate=13,
+                                 hour=35, amount=72)
+        member.contributed_amount = 10
+        self.assertEqual(member.actual_value, 10)
+        member.contributed_amount = 5000
+        self.assertEqual(member.actual_value, member.max_value)
+        # an invalid amount falls back to DEFAULT_MIN_AMOUNT
+        member.contributed_amount = 5001
+        self.assertEqual(member.actual_value, 0)
+
+    def test_number_of_workers(self):
+        member = k401.Member401k(name='Sue Park', number=1300,
+                                 salary=120000, num_worker=5)
+        self.assertFalse(member.bonus_eligible)
+        member.number_of_workers = 6
+        self.assertTrue(member.bonus_eligible)
+
+    def test_max_match_call_keeps_the_reported_pay(self):
+        member = k401.Member401k(name='Ann Lee', number=1300, rate=13,
+                                 hour=35, amount=72)
+        self.assertEqual(member.max_match(rate=5, hour=10), 10)
+        # the report still shows the pay of the attributes
+        self.assertEqual(member.current_gross_pay, 455)
+        self.assertEqual(member.monthly_pay, 1820)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import importlib.util
+import json
+import os
+import unittest
+import warnings
+
+# 401K.py is not a valid module name, so load it from its path
+PATH = os.path.join(os.path.dirname(__file__), os.pardir, '401K.py')
+spec = importlib.util.spec_from_file_location('member401k', PATH)
+k401 = importlib.util.module_from_spec(spec)
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', SyntaxWarning)
+    spec.loader.exec_module(k401)
+
+
+def expected(**kwargs):
+    member = k401.Member401k(name='Query', number=1234, **kwargs)
+    return {'max_match': member.max_value,
+            'actual_match': member.actual_value,
+            'monthly_pay': member.monthly_pay}
+
+
+class MatchServiceTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_coalesced_queries_match_member401k(self):
+        service = k401.MatchService(window=0.05)
+        queries = [{'id': 1, 'rate': 13, 'hour': 35, 'amount': 72},
+                   {'id': 2, 'salary': 120000, 'amount': 300},
+                   {'id': 3, 'rate': 99, 'hour': 35, 'amount': 10}]
+        answers = await asyncio.gather(
+            *(service.answer(json.dumps(query)) for query in queries))
+        self.assertEqual(service.batches, 1)
+        for query, answer in zip(queries, answers):
+            kwargs = {key: value for key, value in query.items()
+                      if key != 'id'}
+            self.assertEqual(answer, dict(expected(**kwargs), id=query['id']))
+
+    async def test_bad_query_only_fails_itself(self):
+        service = k401.MatchService(window=0.05)
+        good = {'id': 0, 'rate': 13, 'hour': 35, 'amount': 72}
+        bad = [{'id': 1, 'amount': 'lots'}, {'id': 2, 'amount': None},
+               {'id': 3, 'amount': [1]}, {'id': 4, 'rate': [1]},
+               {'id': 5, 'rate': 10 ** 30, 'hour': 35, 'amount': 5}]
+        answers = await asyncio.wait_for(asyncio.gather(
+            *(service.answer(json.dumps(query)) for query in [good] + bad)),
+            timeout=5)
+        self.assertEqual(answers[0],
+                         dict(expected(rate=13, hour=35, amount=72), id=0))
+        for answer in answers[1:5]:
+            self.assertIn('error', answer)
+        # an out of range rate falls back like any invalid rate
+        self.assertEqual(answers[5],
+                         dict(expected(rate=10 ** 30, hour=35, amount=5),
+                              id=5))
+
+    async def test_unhashable_number(self):
+        service = k401.MatchService(k401.EmployeeRegistry())
+        answer = await service.answer(json.dumps({'id': 1, 'number': [1300]}))
+        self.assertIn('error', answer)
+        self.assertEqual(answer['id'], 1)
+
+    async def test_number_without_registry(self):
+        service = k401.MatchService()
+        answer = await service.answer(json.dumps({'id': 1, 'number': 1300}))
+        self.assertIn('error', answer)
+
+    async def test_ambiguous_number(self):
+        # both ids are invalid and fall back to DEFAULT_NUM
+        members = [k401.Member401k(name='Ann Lee', number=number, rate=10,
+                                   hour=40)
+                   for number in (1, 2)]
+        service = k401.MatchService(k401.EmployeeRegistry(members))
+        answer = await service.answer(json.dumps(
+            {'number': k401.Employee.DEFAULT_NUM}))
+        self.assertIn('error', answer)
+
+    async def test_pipelined_answers_come_back_in_order(self):
+        member = k401.Member401k(name='Ann Lee', number=1300, rate=10,
+                                 hour=40, amount=50)
+        service = k401.MatchService(k401.EmployeeRegistry([member]))
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            queries = [{'id': 1, 'number': 1300},
+                       {'id': 2, 'number': [1300]},
+                       {'id': 3, 'salary': 60000, 'amount': 100},
+                       {'id': 4, 'amount': 'lots'},
+                       {'id': 5, 'rate': 20, 'hour': 40, 'amount': 1000}]
+            writer.write(b''.join(json.dumps(query).encode() + b'\n'
+                                  for query in queries))
+            await writer.drain()
+            answers = [json.loads(await asyncio.wait_for(reader.readline(),
+                                                         timeout=5))
+                       for _ in queries]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            server.close()
+            await server.wait_closed()
+        self.assertEqual([answer['id'] for answer in answers],
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(answers[0]['max_match'], member.max_value)
+        self.assertIn('error', answers[1])
+        self.assertEqual(answers[2],
+                         dict(expected(salary=60000, amount=100), id=3))
+        self.assertIn('error', answers[3])
+        self.assertEqual(answers[4],
+                         dict(expected(rate=20, hour=40, amount=1000), id=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
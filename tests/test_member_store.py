@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import warnings
+
+# 401K.py is not a valid module name, so load it from its path
+PATH = os.path.join(os.path.dirname(__file__), os.pardir, '401K.py')
+spec = importlib.util.spec_from_file_location('member401k', PATH)
+k401 = importlib.util.module_from_spec(spec)
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', SyntaxWarning)
+    spec.loader.exec_module(k401)
+
+
+class MemberStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = k401.MemberStore(os.path.join(directory.name,
+                                                   'members.db'))
+        self.addCleanup(self.store.close)
+        self.members = [k401.Member401k(name='Ann Lee', number=1000 + i,
+                                        rate=13, hour=i % 41, amount=72)
+                        for i in range(25)]
+
+    def test_save_replaces_the_stored_members(self):
+        self.store.save(self.members)
+        self.store.save(self.members)
+        self.assertEqual(len(self.store), len(self.members))
+        self.assertEqual(len(self.store.find(1000)), 1)
+        self.store.save(self.members[:3], append=True)
+        self.assertEqual(len(self.store.find(1000)), 2)
+
+    def test_load_columns_in_batches(self):
+        self.store.save(self.members)
+        columns = self.store.load_columns(fetch_size=7)
+        self.assertEqual(columns['number'].tolist(),
+                         [member.employee_num for member in self.members])
+        self.assertEqual(columns['actual_match'].tolist(),
+                         [member.actual_value for member in self.members])
+        self.assertEqual(columns['is_supervisor'].dtype, bool)
+        self.store.clear()
+        self.assertEqual(len(self.store.load_columns()['number']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import importlib.util
+import os
+import random
+import unittest
+import warnings
+
+# 401K.py is not a valid module name, so load it from its path
+PATH = os.path.join(os.path.dirname(__file__), os.pardir, '401K.py')
+spec = importlib.util.spec_from_file_location('member401k', PATH)
+k401 = importlib.util.module_from_spec(spec)
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', SyntaxWarning)
+    spec.loader.exec_module(k401)
+
+
+def population(size, seed=7):
+    """Members with invalid rates, hours and salaries, over-cap amounts and
+    supervisors on both sides of WORKERS_REQUIRED and MAX_SALARY."""
+    rng = random.Random(seed)
+    members = []
+    for number in range(size):
+        amount = rng.choice([0, 10, 72, 300, 4999, 6000, -5])
+        if rng.random() < 0.5:
+            members.append(k401.Member401k(
+                name='Sue Park', number=1000 + number,
+                salary=rng.choice([50000, 120000, 195000, 200000, 250000,
+                                   'x']),
+                num_worker=rng.choice([0, 3, 6, 9]), amount=amount))
+        else:
+            members.append(k401.Member401k(
+                name='Ann Lee', number=1000 + number,
+                rate=rng.choice([13, 20, 25, -1, 3.5]),
+                hour=rng.choice([10, 40, 41]), amount=amount))
+    return members
+
+
+def actual_total(members):
+    return sum(member.actual_value for member in members)
+
+
+class ScenarioTest(unittest.TestCase):
+
+    def test_current_policy_matches_members_after_bonus(self):
+        members = population(400)
+        before = k401.population_columns(members)
+        k401.apply_bonus(members, '2026-10')
+        after = k401.population_columns(members)
+        total = actual_total(members)
+        for columns in (before, after):
+            result, = k401.evaluate_scenarios(columns, [{}])
+            self.assertEqual(result['total_match'], total)
+
+    def test_paid_bonus_is_not_added_again(self):
+        supervisor = k401.Member401k(name='Sue Park', number=1000,
+                                     salary=120000, num_worker=9, amount=600)
+        k401.apply_bonus([supervisor], '2026-10')
+        result, = k401.evaluate_scenarios(
+            k401.population_columns([supervisor]), [{}])
+        self.assertEqual(result['total_match'], supervisor.actual_value)
+
+    def test_other_bonus_replaces_paid_bonus(self):
+        paid = k401.Member401k(name='Sue Park', number=1000, salary=120000,
+                               num_worker=9, amount=600)
+        k401.apply_bonus([paid], '2026-10')
+        unpaid = k401.Member401k(name='Sue Park', number=1000, salary=120000,
+                                 num_worker=9, amount=600)
+        scenarios = [{'BONUS_ADD_TO_SALARY': 0},
+                     {'BONUS_ADD_TO_SALARY': 20000}]
+        self.assertEqual(
+            k401.evaluate_scenarios(k401.population_columns([paid]),
+                                    scenarios),
+            k401.evaluate_scenarios(k401.population_columns([unpaid]),
+                                    scenarios))
+
+
+if __name__ == '__main__':
+    unittest.main()